@@ -1,98 +1,159 @@
-from flask import Flask, request, redirect, jsonify, json
+from flask import Flask, Response, request, redirect, jsonify, stream_with_context, g
+from flask.json.provider import DefaultJSONProvider
 import time
 import jiosaavn
+import upstream
+import cache
+import helper
+import metrics
+import policy
+import http_cache
+import records
+import routes
 import os
+from itertools import islice
 from traceback import print_exc
 from flask_cors import CORS
 
 app = Flask(__name__)
+app.json_provider_class = records.json_provider(DefaultJSONProvider)
+app.json = app.json_provider_class(app)
 app.secret_key = os.environ.get("SECRET",'thankyoutonystark#weloveyou3000')
 CORS(app)
 
 
+def ndjson(streamed):
+    if streamed is None:
+        return Response('null\n', mimetype=routes.NDJSON_MIMETYPE)
+    info, songs = streamed
+    end = None if g.limit is None else g.offset+g.limit
+    fields = g.fields
+
+    def lines():
+        yield records.dumps(info)+b'\n'
+        for song in islice(songs, g.offset, end):
+            yield records.dumps(helper.project(song, fields))+b'\n'
+    return Response(stream_with_context(lines()), mimetype=routes.NDJSON_MIMETYPE)
+
+def failed(message):
+    g.response_kind = http_cache.ERROR
+    return jsonify(routes.error(message))
+
+def respond(data):
+    if helper.partial(data):
+        g.response_kind = http_cache.PARTIAL
+    return jsonify(data)
+
+@app.before_request
+def track_request():
+    g.route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.started = time.perf_counter()
+    metrics.request_started(g.route)
+
+@app.after_request
+def observe_request(response):
+    metrics.observe_request(g.route, request.method, response.status_code, time.perf_counter()-g.started)
+    return response
+
+@app.after_request
+def compress_and_tag(response):
+    if response.status_code != 200 or response.is_streamed or 'Content-Encoding' in response.headers:
+        return response
+    status, body, headers = http_cache.finish(g.route, response.get_data(), request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding'), g.get('response_kind'))
+    response.status_code = status
+    response.set_data(body)
+    response.headers.update(headers)
+    return response
+
+@app.teardown_request
+def finish_request(exception=None):
+    if 'route' in g:
+        metrics.request_finished(g.route)
+
+@app.before_request
+def cache_control():
+    cache.set_bypass(routes.bypass(request.args, request.headers))
+
+@app.before_request
+def page_options():
+    try:
+        g.fields, g.offset, g.limit = helper.page_options(request.args)
+    except ValueError:
+        return failed('offset and limit must be whole numbers!')
+
+def upstream_unavailable(e):
+    print(e)
+    return jsonify(routes.error(routes.UNAVAILABLE)), 503, routes.NO_STORE
+
+for error in jiosaavn.UPSTREAM_ERRORS:
+    app.register_error_handler(error, upstream_unavailable)
+
 @app.route('/')
 def home():
-    return redirect("https://cyberboysumanjay.github.io/JioSaavnAPI/")
+    return redirect(routes.HOME_URL)
+
+@app.route('/stats/')
+def stats():
+    return jsonify(routes.stats(upstream.pool_stats()))
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(cache.stats(), upstream.pool_stats(), policy.stats()), mimetype=routes.METRICS_MIMETYPE)
 
 @app.route('/song/')
 def search():
-    lyrics = False
-    songdata = True
     query = request.args.get('query')
-    lyrics_ = request.args.get('lyrics')
-    songdata_ = request.args.get('songdata')
-    if lyrics_ and lyrics_.lower()!='false':
-        lyrics = True
-    if songdata_ and songdata_.lower()!='true':
-        songdata = False
     if query:
-        return jsonify(jiosaavn.search_for_song(query, lyrics, songdata))
+        return respond(jiosaavn.search_for_song(query, routes.lyrics(request.args), routes.songdata(request.args), g.fields, g.offset, g.limit))
     else:
-        error = {
-            "status": False,
-            "error":'Query is required to search songs!'
-        }
-        return jsonify(error)
+        return failed('Query is required to search songs!')
 
 @app.route('/song/get/')
 def get_song():
-    lyrics = False
     id = request.args.get('id')
-    lyrics_ = request.args.get('lyrics')
-    if lyrics_ and lyrics_.lower()!='false':
-        lyrics = True
     if id:
-        resp = jiosaavn.get_song(id,lyrics)
+        resp = jiosaavn.get_song(id,routes.lyrics(request.args),g.fields)
         if not resp:
-            error = {
-                "status": False,
-                "error": 'Invalid Song ID received!'
-            }
-            return jsonify(error)
+            return failed('Invalid Song ID received!')
         else:
-            return jsonify(resp)
+            return respond(resp)
     else:
-        error = {
-            "status": False,
-            "error": 'Song ID is required to get a song!'
-        }
-        return jsonify(error)
+        return failed('Song ID is required to get a song!')
 
 @app.route('/playlist/')
 def playlist():
-    lyrics = False
     query = request.args.get('query')
-    lyrics_ = request.args.get('lyrics')
-    if lyrics_ and lyrics_.lower()!='false':
-        lyrics = True
     if query:
         id = jiosaavn.get_playlist_id(query)
-        songs = jiosaavn.get_playlist(id,lyrics)
-        return jsonify(songs)
+        if routes.streamed(request.args):
+            return ndjson(jiosaavn.stream_playlist(id,routes.lyrics(request.args)))
+        songs = jiosaavn.get_playlist(id,routes.lyrics(request.args),g.fields,g.offset,g.limit)
+        return respond(songs)
     else:
-        error = {
-            "status": False,
-            "error":'Query is required to search playlists!'
-        }
-        return jsonify(error)
+        return failed('Query is required to search playlists!')
 
 @app.route('/album/')
 def album():
-    lyrics = False
     query = request.args.get('query')
-    lyrics_ = request.args.get('lyrics')
-    if lyrics_ and lyrics_.lower()!='false':
-        lyrics = True
     if query:
         id = jiosaavn.get_album_id(query)
-        songs = jiosaavn.get_album(id,lyrics)
-        return jsonify(songs)
+        if routes.streamed(request.args):
+            return ndjson(jiosaavn.stream_album(id,routes.lyrics(request.args)))
+        songs = jiosaavn.get_album(id,routes.lyrics(request.args),g.fields,g.offset,g.limit)
+        return respond(songs)
     else:
-        error = {
-            "status": False,
-            "error":'Query is required to search albums!'
-        }
-        return jsonify(error)
+        return failed('Query is required to search albums!')
+
+@app.route('/songs/batch', methods=['POST'])
+def songs_batch():
+    try:
+        items, lyrics, fields = routes.batch(request.get_json(silent=True), request.args, g.fields)
+    except ValueError as e:
+        return failed(str(e))
+    return jsonify({
+        "status": True,
+        "results": jiosaavn.get_song_batch(items, lyrics, fields)
+    })
 
 @app.route('/lyrics/')
 def lyrics():
@@ -100,67 +161,40 @@ def lyrics():
 
     if query:
         try:
-            if 'http' in query and 'saavn' in query:
-                id = jiosaavn.get_song_id(query)
-                lyrics = jiosaavn.get_lyrics(id)
-            else:
-                lyrics = jiosaavn.get_lyrics(query)
+            if routes.is_link(query):
+                query = jiosaavn.get_song_id(query)
             response = {}
             response['status'] = True
-            response['lyrics'] = lyrics
+            response['lyrics'] = jiosaavn.get_lyrics(query)
             return jsonify(response)
+        except jiosaavn.UPSTREAM_ERRORS:
+            raise
         except Exception as e:
-            error = {
-            "status": False,
-            "error": str(e)
-            }
-            return jsonify(error)
-        
+            return failed(str(e))
     else:
-        error = {
-            "status": False,
-            "error":'Query containing song link or id is required to fetch lyrics!'
-        }
-        return jsonify(error)
+        return failed('Query containing song link or id is required to fetch lyrics!')
 
 
 @app.route('/result/')
 def result():
-    lyrics = False
     query = request.args.get('query')
-    lyrics_ = request.args.get('lyrics')
-    if lyrics_ and lyrics_.lower()!='false':
-        lyrics = True
+    lyrics = routes.lyrics(request.args)
+    kind = routes.result_kind(query)
 
-    if 'saavn' not in query:
-        return jsonify(jiosaavn.search_for_song(query,lyrics,True))
+    if kind == 'search':
+        return respond(jiosaavn.search_for_song(query,lyrics,True,g.fields,g.offset,g.limit))
     try:
-        if '/song/' in query:
-            print("Song")
-            song_id = jiosaavn.get_song_id(query)
-            song = jiosaavn.get_song(song_id,lyrics)
-            return jsonify(song)
-
-        elif '/album/' in query:
-            print("Album")
-            id = jiosaavn.get_album_id(query)
-            songs = jiosaavn.get_album(id,lyrics)
-            return jsonify(songs)
-
-        elif '/playlist/' or '/featured/' in query:
-            print("Playlist")
-            id = jiosaavn.get_playlist_id(query)
-            songs = jiosaavn.get_playlist(id,lyrics)
-            return jsonify(songs)
-
+        if kind == 'song':
+            return respond(jiosaavn.get_song(jiosaavn.get_song_id(query),lyrics,g.fields))
+        elif kind == 'album':
+            return respond(jiosaavn.get_album(jiosaavn.get_album_id(query),lyrics,g.fields,g.offset,g.limit))
+        else:
+            return respond(jiosaavn.get_playlist(jiosaavn.get_playlist_id(query),lyrics,g.fields,g.offset,g.limit))
+    except jiosaavn.UPSTREAM_ERRORS:
+        raise
     except Exception as e:
         print_exc()
-        error = {
-            "status": True,
-            "error":str(e)
-        }
-        return jsonify(error)
-    return None
+        return failed(str(e))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,208 @@
+from quart import Quart, Response, request, redirect, jsonify, g
+import os
+import time
+import jiosaavn_async as jiosaavn
+import cache
+import helper
+import metrics
+import policy
+import http_cache
+import records
+import routes
+from traceback import print_exc
+from quart_cors import cors
+from quart.json.provider import DefaultJSONProvider
+from quart.wrappers.response import DataBody
+
+app = Quart(__name__)
+app.json_provider_class = records.json_provider(DefaultJSONProvider)
+app.json = app.json_provider_class(app)
+app.secret_key = os.environ.get("SECRET",'thankyoutonystark#weloveyou3000')
+app = cors(app)
+
+
+def ndjson(streamed):
+    if streamed is None:
+        return Response('null\n', mimetype=routes.NDJSON_MIMETYPE)
+    info, songs = streamed
+    fields, offset, limit = g.fields, g.offset, g.limit
+
+    async def lines():
+        yield records.dumps(info)+b'\n'
+        index = 0
+        async for song in songs:
+            if limit is not None and index >= offset+limit:
+                break
+            if index >= offset:
+                yield records.dumps(helper.project(song, fields))+b'\n'
+            index += 1
+    return Response(lines(), mimetype=routes.NDJSON_MIMETYPE)
+
+def failed(message):
+    g.response_kind = http_cache.ERROR
+    return jsonify(routes.error(message))
+
+def respond(data):
+    if helper.partial(data):
+        g.response_kind = http_cache.PARTIAL
+    return jsonify(data)
+
+@app.before_request
+async def track_request():
+    g.route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.started = time.perf_counter()
+    metrics.request_started(g.route)
+
+@app.after_request
+async def observe_request(response):
+    metrics.observe_request(g.route, request.method, response.status_code, time.perf_counter()-g.started)
+    return response
+
+@app.after_request
+async def compress_and_tag(response):
+    if response.status_code != 200 or not isinstance(response.response, DataBody) or 'Content-Encoding' in response.headers:
+        return response
+    status, body, headers = http_cache.finish(g.route, await response.get_data(), request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding'), g.get('response_kind'))
+    response.status_code = status
+    response.set_data(body)
+    response.headers.update(headers)
+    return response
+
+@app.teardown_request
+async def finish_request(exception=None):
+    if 'route' in g:
+        metrics.request_finished(g.route)
+
+@app.before_request
+async def cache_control():
+    cache.set_bypass(routes.bypass(request.args, request.headers))
+
+@app.after_serving
+async def close_upstream():
+    await jiosaavn.close()
+
+@app.before_request
+async def page_options():
+    try:
+        g.fields, g.offset, g.limit = helper.page_options(request.args)
+    except ValueError:
+        return failed('offset and limit must be whole numbers!')
+
+async def upstream_unavailable(e):
+    print(e)
+    return jsonify(routes.error(routes.UNAVAILABLE)), 503, routes.NO_STORE
+
+for error in jiosaavn.UPSTREAM_ERRORS:
+    app.register_error_handler(error, upstream_unavailable)
+
+@app.route('/')
+async def home():
+    return redirect(routes.HOME_URL)
+
+@app.route('/stats/')
+async def stats():
+    return jsonify(routes.stats(jiosaavn.pool_stats()))
+
+@app.route('/metrics')
+async def prometheus_metrics():
+    return Response(metrics.render(cache.stats(), jiosaavn.pool_stats(), policy.stats()), mimetype=routes.METRICS_MIMETYPE)
+
+@app.route('/song/')
+async def search():
+    query = request.args.get('query')
+    if query:
+        return respond(await jiosaavn.search_for_song(query, routes.lyrics(request.args), routes.songdata(request.args), g.fields, g.offset, g.limit))
+    else:
+        return failed('Query is required to search songs!')
+
+@app.route('/song/get/')
+async def get_song():
+    id = request.args.get('id')
+    if id:
+        resp = await jiosaavn.get_song(id,routes.lyrics(request.args),g.fields)
+        if not resp:
+            return failed('Invalid Song ID received!')
+        else:
+            return respond(resp)
+    else:
+        return failed('Song ID is required to get a song!')
+
+@app.route('/playlist/')
+async def playlist():
+    query = request.args.get('query')
+    if query:
+        id = await jiosaavn.get_playlist_id(query)
+        if routes.streamed(request.args):
+            return ndjson(await jiosaavn.stream_playlist(id,routes.lyrics(request.args)))
+        songs = await jiosaavn.get_playlist(id,routes.lyrics(request.args),g.fields,g.offset,g.limit)
+        return respond(songs)
+    else:
+        return failed('Query is required to search playlists!')
+
+@app.route('/album/')
+async def album():
+    query = request.args.get('query')
+    if query:
+        id = await jiosaavn.get_album_id(query)
+        if routes.streamed(request.args):
+            return ndjson(await jiosaavn.stream_album(id,routes.lyrics(request.args)))
+        songs = await jiosaavn.get_album(id,routes.lyrics(request.args),g.fields,g.offset,g.limit)
+        return respond(songs)
+    else:
+        return failed('Query is required to search albums!')
+
+@app.route('/songs/batch', methods=['POST'])
+async def songs_batch():
+    try:
+        items, lyrics, fields = routes.batch(await request.get_json(silent=True), request.args, g.fields)
+    except ValueError as e:
+        return failed(str(e))
+    return jsonify({
+        "status": True,
+        "results": await jiosaavn.get_song_batch(items, lyrics, fields)
+    })
+
+@app.route('/lyrics/')
+async def lyrics():
+    query = request.args.get('query')
+
+    if query:
+        try:
+            if routes.is_link(query):
+                query = await jiosaavn.get_song_id(query)
+            response = {}
+            response['status'] = True
+            response['lyrics'] = await jiosaavn.get_lyrics(query)
+            return jsonify(response)
+        except jiosaavn.UPSTREAM_ERRORS:
+            raise
+        except Exception as e:
+            return failed(str(e))
+    else:
+        return failed('Query containing song link or id is required to fetch lyrics!')
+
+
+@app.route('/result/')
+async def result():
+    query = request.args.get('query')
+    lyrics = routes.lyrics(request.args)
+    kind = routes.result_kind(query)
+
+    if kind == 'search':
+        return respond(await jiosaavn.search_for_song(query,lyrics,True,g.fields,g.offset,g.limit))
+    try:
+        if kind == 'song':
+            return respond(await jiosaavn.get_song(await jiosaavn.get_song_id(query),lyrics,g.fields))
+        elif kind == 'album':
+            return respond(await jiosaavn.get_album(await jiosaavn.get_album_id(query),lyrics,g.fields,g.offset,g.limit))
+        else:
+            return respond(await jiosaavn.get_playlist(await jiosaavn.get_playlist_id(query),lyrics,g.fields,g.offset,g.limit))
+    except jiosaavn.UPSTREAM_ERRORS:
+        raise
+    except Exception as e:
+        print_exc()
+        return failed(str(e))
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,220 @@
+import os
+import time
+import threading
+import contextvars
+from collections import OrderedDict
+from traceback import print_exc
+import singleflight
+import store as disk
+import records
+
+MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 5000))
+MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 64*1024*1024))
+TTL = float(os.environ.get("CACHE_TTL", 3600))
+STALE_TTL = float(os.environ.get("CACHE_STALE_TTL", 600))
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_refreshing = set()
+_bytes = 0
+_bypass = contextvars.ContextVar('cache_bypass', default=False)
+_counters = {
+    "hits": 0,
+    "stale_hits": 0,
+    "misses": 0,
+    "evictions": 0,
+    "refreshes": 0,
+    "coalesced": 0,
+    "disk_hits": 0,
+    "stale_fallbacks": 0
+}
+
+class Entry:
+    __slots__ = ('value', 'size', 'fresh_until', 'stale_until')
+
+    def __init__(self, value, size, now):
+        self.value = value
+        self.size = size
+        self.fresh_until = now+TTL
+        self.stale_until = now+TTL+STALE_TTL
+
+def set_bypass(flag):
+    _bypass.set(flag)
+
+def bypassed():
+    return _bypass.get()
+
+def _size(value):
+    try:
+        return len(records.dumps(value))
+    except (TypeError, ValueError):
+        return 1024
+
+def count(name):
+    with _lock:
+        _counters[name] += 1
+
+def lookup(key):
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and now < entry.stale_until:
+            _entries.move_to_end(key)
+            return entry.value, now < entry.fresh_until
+    return _lookup_disk(key, now)
+
+def in_memory(key, fresh=False):
+    with _lock:
+        entry = _entries.get(key)
+        return entry is not None and time.monotonic() < (entry.fresh_until if fresh else entry.stale_until)
+
+def on_disk(key):
+    age = disk.age(key)
+    return age is not None and age < TTL
+
+def _lookup_disk(key, now):
+    value, age = disk.get(key)
+    if value is None or age >= TTL+STALE_TTL:
+        return None, False
+    _remember(key, value, now-age)
+    count("disk_hits")
+    return value, age < TTL
+
+def store(key, value):
+    if value is None:
+        return
+    _remember(key, value, time.monotonic())
+    disk.put(key, value)
+
+def _remember(key, value, stored_at):
+    global _bytes
+    size = _size(value)
+    if size > MAX_BYTES:
+        return
+    entry = Entry(value, size, stored_at)
+    with _lock:
+        if key in _entries:
+            _bytes -= _entries.pop(key).size
+        _entries[key] = entry
+        _bytes += size
+        while len(_entries) > MAX_ENTRIES or _bytes > MAX_BYTES:
+            oldest = next(iter(_entries))
+            _drop(oldest)
+            _counters["evictions"] += 1
+
+def _drop(key):
+    global _bytes
+    entry = _entries.pop(key, None)
+    if entry is not None:
+        _bytes -= entry.size
+
+def clear():
+    global _bytes
+    with _lock:
+        _entries.clear()
+        _bytes = 0
+
+def claim_refresh(key):
+    with _lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+        return True
+
+def release_refresh(key):
+    with _lock:
+        _refreshing.discard(key)
+
+def refreshed(key, value, cacheable):
+    if value is not None and cacheable(value):
+        store(key, value)
+    count("refreshes")
+
+def _refresh(key, loader, cacheable):
+    try:
+        refreshed(key, loader(), cacheable)
+    except Exception:
+        print_exc()
+    finally:
+        release_refresh(key)
+
+def _revalidate(key, loader, cacheable):
+    if not claim_refresh(key):
+        return
+    threading.Thread(target=_refresh, args=(key, loader, cacheable), daemon=True).start()
+
+def entry_key(kind, id, lyrics):
+    return (kind, id, bool(lyrics))
+
+def peek(key):
+    if bypassed():
+        return None, False
+    value, fresh = lookup(key)
+    if value is not None:
+        count("hits" if fresh else "stale_hits")
+    return value, fresh
+
+def fresh_value(key):
+    value, fresh = (None, False) if bypassed() else lookup(key)
+    if value is not None and fresh:
+        count("hits")
+        return value
+    count("misses")
+    return None
+
+def flight_key(key, variant):
+    return key+(variant,)
+
+def get_or_load(kind, id, lyrics, loader, cacheable=lambda value: True, variant=None):
+    key = entry_key(kind, id, lyrics)
+    value, fresh = peek(key)
+    if value is not None:
+        if not fresh:
+            _revalidate(key, loader, cacheable)
+        return value
+    count("misses")
+    value, shared = singleflight.do(flight_key(key, variant), lambda: _load(key, loader, cacheable))
+    if shared:
+        count("coalesced")
+    return value
+
+def _load(key, loader, cacheable):
+    try:
+        value = loader()
+    except Exception as e:
+        return recover(key, e)
+    return settle(key, value, cacheable)
+
+def settle(key, value, cacheable):
+    if value is None:
+        return fallback(key)
+    if cacheable(value):
+        store(key, value)
+    return value
+
+def recover(key, error):
+    value = fallback(key)
+    if value is None:
+        raise error
+    return value
+
+def fallback(key):
+    with _lock:
+        entry = _entries.get(key)
+        value = entry.value if entry is not None else None
+    if value is None:
+        value, age = disk.get(key)
+    if value is not None:
+        count("stale_fallbacks")
+    return value
+
+def stats():
+    with _lock:
+        stats = dict(_counters)
+        stats["entries"] = len(_entries)
+        stats["bytes"] = _bytes
+        stats["max_entries"] = MAX_ENTRIES
+        stats["max_bytes"] = MAX_BYTES
+    stats["in_flight"] = singleflight.in_flight()
+    stats["disk"] = disk.stats()
+    return stats
@@ -1,5 +1,18 @@
-search_base_url = "https://www.jiosaavn.com/api.php?__call=autocomplete.get&_format=json&_marker=0&cc=in&includeMetaTags=1&query="
-song_details_base_url = "https://www.jiosaavn.com/api.php?__call=song.getDetails&cc=in&_marker=0%3F_marker%3D0&_format=json&pids="
-album_details_base_url = "https://www.jiosaavn.com/api.php?__call=content.getAlbumDetails&_format=json&cc=in&_marker=0%3F_marker%3D0&albumid="
-playlist_details_base_url = "https://www.jiosaavn.com/api.php?__call=playlist.getDetails&_format=json&cc=in&_marker=0%3F_marker%3D0&listid="
-lyrics_base_url = "https://www.jiosaavn.com/api.php?__call=lyrics.getLyrics&ctx=web6dot0&api_version=4&_format=json&_marker=0%3F_marker%3D0&lyrics_id="
\ No newline at end of file
+import os
+
+default_base_url = "https://www.jiosaavn.com"
+base_url = os.environ.get("JIOSAAVN_BASE_URL", default_base_url).rstrip('/')
+
+search_base_url = base_url+"/api.php?__call=autocomplete.get&_format=json&_marker=0&cc=in&includeMetaTags=1&query="
+song_details_base_url = base_url+"/api.php?__call=song.getDetails&cc=in&_marker=0%3F_marker%3D0&_format=json&pids="
+album_details_base_url = base_url+"/api.php?__call=content.getAlbumDetails&_format=json&cc=in&_marker=0%3F_marker%3D0&albumid="
+playlist_details_base_url = base_url+"/api.php?__call=playlist.getDetails&_format=json&cc=in&_marker=0%3F_marker%3D0&listid="
+lyrics_base_url = base_url+"/api.php?__call=lyrics.getLyrics&ctx=web6dot0&api_version=4&_format=json&_marker=0%3F_marker%3D0&lyrics_id="
+song_token_base_url = base_url+"/api.php?__call=webapi.get&type=song&includeMetaTags=0&_format=json&cc=in&_marker=0%3F_marker%3D0&token="
+album_token_base_url = base_url+"/api.php?__call=webapi.get&type=album&includeMetaTags=0&_format=json&cc=in&_marker=0%3F_marker%3D0&token="
+playlist_token_base_url = base_url+"/api.php?__call=webapi.get&type=playlist&includeMetaTags=0&_format=json&cc=in&_marker=0%3F_marker%3D0&token="
+
+def page_url(path):
+    if base_url == default_base_url:
+        return 'https://'+path
+    return base_url+'/'+path.partition('/')[2]
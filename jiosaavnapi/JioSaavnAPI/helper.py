@@ -1,20 +1,40 @@
-import base64
+import os
+import re
+import html
+import json
+import time
+import contextvars
 import jiosaavn
-from pyDes import *
+import decrypt
+import records
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 
-def format_song(data,lyrics):
-    try:
-        url = data['media_preview_url']
-        url = url.replace("preview", "aac")
-        if data['320kbps']=="true":
-            url = url.replace("_96_p.mp4", "_320.mp4")
-        else:
-            url = url.replace("_96_p.mp4", "_160.mp4")
-        data['media_url'] = url
-    except KeyError or TypeError:
-        data['media_url'] = decrypt_url(data['encrypted_media_url'])
-        if data['320kbps']!="true":
-            data['media_url'] = data['media_url'].replace("_320.mp4","_160.mp4")
+LYRICS_WORKERS = int(os.environ.get("LYRICS_WORKERS", 8))
+LYRICS_DEADLINE = float(os.environ.get("LYRICS_DEADLINE", 5))
+
+_lyrics_pool = ThreadPoolExecutor(max_workers=LYRICS_WORKERS, thread_name_prefix='lyrics')
+
+ENTITY = re.compile(r'&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);')
+ENTITY_OVERRIDES = {
+    "&quot;": "'",
+    "&#039;": "'"
+}
+
+def format_song(data,lyrics,media_url=True):
+    if media_url:
+        try:
+            url = data['media_preview_url']
+            url = url.replace("preview", "aac")
+            if data['320kbps']=="true":
+                url = url.replace("_96_p.mp4", "_320.mp4")
+            else:
+                url = url.replace("_96_p.mp4", "_160.mp4")
+            data['media_url'] = url
+        except KeyError or TypeError:
+            data['media_url'] = decrypt_url(data['encrypted_media_url'])
+            if data['320kbps']!="true":
+                data['media_url'] = data['media_url'].replace("_320.mp4","_160.mp4")
 
     data['song'] = format(data['song'])
     data['music'] = format(data['music'])
@@ -24,40 +44,173 @@ def format_song(data,lyrics):
     data["primary_artists"] = format(data["primary_artists"])
     data['image'] = data['image'].replace("150x150","500x500")
 
-    if lyrics:
-        if data['has_lyrics']=='true':
-            data['lyrics'] = jiosaavn.get_lyrics(data['id'])
-        else:
-            data['lyrics'] = None
-
     try:
-        data['copyright_text'] = data['copyright_text'].replace("&copy;","©")
+        data['copyright_text'] = format(data['copyright_text'])
     except KeyError:
         pass
-    return data
+    song = records.Song(data)
+
+    if lyrics:
+        add_lyrics([song])
+    return song
+
+def format_album(data,lyrics,media_url=True):
+    album = format_album_info(data)
+    album['songs'] = format_songs(album['songs'],lyrics,media_url)
+    return album
 
-def format_album(data,lyrics):
+def format_album_info(data):
     data['image'] = data['image'].replace("150x150","500x500")
     data['name'] = format(data['name'])
     data['primary_artists'] = format(data['primary_artists'])
     data['title'] = format(data['title'])
-    for song in data['songs']:
-        song = format_song(song,lyrics)
-    return data
+    return records.Album(data)
+
+def format_playlist(data,lyrics,media_url=True):
+    playlist = format_playlist_info(data)
+    playlist['songs'] = format_songs(playlist['songs'],lyrics,media_url)
+    return playlist
 
-def format_playlist(data,lyrics):
+def format_playlist_info(data):
     data['firstname'] = format(data['firstname'])
     data['listname'] = format(data['listname'])
-    for song in data['songs']:
-        song = format_song(song,lyrics)
-    return data
+    return records.Playlist(data)
+
+def header(data):
+    return {key: value for key, value in data.items() if key != 'songs'}
+
+def format_songs(songs,lyrics,media_url=True):
+    if media_url:
+        decrypt_songs(songs)
+    songs = [format_song(song,False,media_url) for song in songs]
+    if lyrics:
+        add_lyrics(songs)
+    return songs
+
+def iter_songs(songs,lyrics,deadline=None):
+    decrypt_songs(songs)
+    futures = []
+    if lyrics:
+        if deadline is None:
+            deadline = time.monotonic()+LYRICS_DEADLINE
+        futures = _submit_lyrics(songs)
+    try:
+        for i, song in enumerate(songs):
+            song = songs[i] = format_song(song,False)
+            if lyrics:
+                _set_lyrics(song, futures[i], deadline)
+            yield song
+    finally:
+        for future in futures:
+            if future is not None:
+                future.cancel()
+
+def decrypt_songs(songs):
+    encrypted = [song['encrypted_media_url'] for song in songs if 'media_preview_url' not in song and song.get('encrypted_media_url')]
+    if encrypted:
+        try:
+            decrypt.decrypt_urls(encrypted)
+        except Exception as e:
+            print(e)
+
+def add_lyrics(songs,deadline=None):
+    if deadline is None:
+        deadline = time.monotonic()+LYRICS_DEADLINE
+    futures = _submit_lyrics(songs)
+    for song, future in zip(songs, futures):
+        _set_lyrics(song, future, deadline)
+    return songs
+
+def _submit_lyrics(songs):
+    futures = []
+    for song in songs:
+        if song['has_lyrics']=='true':
+            context = contextvars.copy_context()
+            futures.append(_lyrics_pool.submit(context.run, jiosaavn.get_lyrics, song['id']))
+        else:
+            futures.append(None)
+    return futures
+
+def _set_lyrics(song, future, deadline):
+    song['lyrics'] = None
+    if future is None:
+        return
+    try:
+        song['lyrics'] = future.result(timeout=max(deadline-time.monotonic(), 0))
+    except TimeoutError:
+        future.cancel()
+        song['lyrics_timeout'] = True
+    except Exception as e:
+        print(e)
+
+def complete(data):
+    if isinstance(data, list):
+        return all(complete(song) for song in data)
+    if 'songs' in data:
+        return complete(data['songs'])
+    return 'media_url' in data and not data.get('lyrics_timeout')
+
+def wants(fields, name):
+    return fields is None or name in fields
+
+def partial(data):
+    if isinstance(data, list):
+        return any(partial(song) for song in data)
+    if not isinstance(data, dict):
+        return False
+    if 'songs' in data:
+        return partial(data['songs'])
+    return bool(data.get('lyrics_timeout'))
+
+def project(record, fields):
+    if fields is None:
+        return record
+    projected = {key: record[key] for key in fields if key in record}
+    if record.get('lyrics_timeout'):
+        projected['lyrics_timeout'] = True
+    return projected
+
+def page(items, offset=0, limit=None):
+    if not offset and limit is None:
+        return items
+    return items[offset:None if limit is None else offset+limit]
+
+def collection(data, songs, fields):
+    if data is None:
+        return None
+    if fields is None and songs is data['songs']:
+        return data
+    result = header(data)
+    result['songs'] = [project(song, fields) for song in songs]
+    return result
+
+def page_options(args):
+    fields = args.get('fields')
+    if fields:
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    offset = max(int(args.get('offset') or 0), 0)
+    limit = args.get('limit')
+    limit = max(int(limit), 0) if limit else None
+    return fields or None, offset, limit
+
+def decode(response):
+    try:
+        return json.loads(response.content)
+    except ValueError:
+        return json.loads(response.text.encode().decode('unicode-escape'))
+
+def _entity(match):
+    entity = match.group(0)
+    return ENTITY_OVERRIDES.get(entity) or html.unescape(entity)
+
+@lru_cache(maxsize=8192)
+def _unescape(string):
+    return ENTITY.sub(_entity, string)
 
 def format(string):
-    return string.encode().decode().replace("&quot;","'").replace("&amp;", "&").replace("&#039;", "'")
+    if '&' not in string:
+        return string
+    return _unescape(string)
 
 def decrypt_url(url):
-    des_cipher = des(b"38346591", ECB, b"\0\0\0\0\0\0\0\0",pad=None, padmode=PAD_PKCS5)
-    enc_url = base64.b64decode(url.strip())
-    dec_url = des_cipher.decrypt(enc_url, padmode=PAD_PKCS5).decode('utf-8')
-    dec_url = dec_url.replace("_96.mp4", "_320.mp4")
-    return dec_url
\ No newline at end of file
+    return decrypt.decrypt_url(url)
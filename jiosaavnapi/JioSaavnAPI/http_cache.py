@@ -0,0 +1,87 @@
+import os
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))
+
+MAX_AGE = {
+    '/song/': 300,
+    '/song/get/': 3600,
+    '/album/': 3600,
+    '/playlist/': 600,
+    '/lyrics/': 86400,
+    '/result/': 300
+}
+ERROR_MAX_AGE = 30
+ERROR = 'error'
+PARTIAL = 'partial'
+
+def negotiate(accept_encoding):
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+def encode(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+def etag(body):
+    return '"{}"'.format(hashlib.sha1(body).hexdigest())
+
+def matches(if_none_match, tag):
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate.split('-', 1)[0].rstrip('"')+'"' == tag:
+            return True
+    return False
+
+def cache_control(route, kind=None):
+    max_age = MAX_AGE.get(route)
+    if max_age is None or kind == PARTIAL:
+        return None
+    if kind == ERROR:
+        max_age = min(max_age, ERROR_MAX_AGE)
+    return 'public, max-age={}'.format(max_age)
+
+def finish(route, body, if_none_match, accept_encoding, kind=None):
+    headers = {"Vary": 'Accept-Encoding'}
+    control = cache_control(route, kind)
+    tag = None
+    if control is None:
+        headers["Cache-Control"] = 'no-store'
+    else:
+        headers["Cache-Control"] = control
+        tag = headers["ETag"] = etag(body)
+        if matches(if_none_match, tag):
+            return 304, b'', headers
+    encoding = negotiate(accept_encoding) if len(body) >= MIN_SIZE else None
+    if encoding:
+        body = encode(body, encoding)
+        headers["Content-Encoding"] = encoding
+        if tag:
+            headers["ETag"] = tag[:-1]+'-'+encoding+'"'
+    return 200, body, headers
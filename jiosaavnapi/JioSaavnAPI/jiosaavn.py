@@ -1,86 +1,415 @@
-import requests
+import upstream
 import endpoints
+import policy
+import requests
 import helper
-import json
+import cache
+import singleflight
+import store
+import prefetch
+import re
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from urllib.parse import urlsplit
 from traceback import print_exc
 
-def search_for_song(query,lyrics,songdata):
-    if query.startswith('http') and 'saavn.com' in query:
+SONG_BATCH_SIZE = 50
+BATCH_RESOLVE_WORKERS = 8
+ID_CACHE_SIZE = 4096
+SCRAPE_OVERLAP = 256
+SCRAPE_CHUNK = 16384
+
+TOKEN_URLS = {
+    'song': endpoints.song_token_base_url,
+    'album': endpoints.album_token_base_url,
+    'playlist': endpoints.playlist_token_base_url
+}
+
+ID_MARKERS = {
+    'song': (re.compile(r'"song":\{"type":"[^{}]*?"id":"([^"]+)"'), re.compile(r'"pid":"([^"]+)"')),
+    'album': (re.compile(r'"album_id":"([^"]+)"'), re.compile(r'"page_id","([^"]+)"')),
+    'playlist': (re.compile(r'"type":"playlist","id":"([^"]+)"'), re.compile(r'"page_id","([^"]+)"'))
+}
+
+UPSTREAM_ERRORS = (policy.Unavailable, requests.RequestException)
+
+_ids = OrderedDict()
+_ids_lock = threading.Lock()
+
+def search_for_song(query,lyrics,songdata,fields=None,offset=0,limit=None):
+    if is_song_link(query):
         id = get_song_id(query)
-        return get_song(id, lyrics)
+        return get_song(id, lyrics, fields)
+    key = search_key(query, lyrics, songdata, fields, offset, limit)
+    result, shared = singleflight.do(key, lambda: _search(query, lyrics, songdata, fields, offset, limit))
+    if shared:
+        cache.count("coalesced")
+    return result
+
+def search_key(query,lyrics,songdata,fields,offset,limit):
+    return ('search', ' '.join(query.lower().split()), bool(lyrics), bool(songdata), tuple(fields) if fields else None, offset, limit)
 
+def is_song_link(query):
+    return query.startswith('http') and 'saavn.com' in query
+
+def _search(query,lyrics,songdata,fields,offset,limit):
     search_base_url = endpoints.search_base_url+query
-    response = requests.get(search_base_url).text.encode().decode('unicode-escape')
-    response = json.loads(response)
-    song_response = response['songs']['data']
+    hits, song_response = search_page(helper.decode(upstream.get(search_base_url)), offset, limit)
     if not songdata:
-        return song_response
-    songs = []
-    for song in song_response:
-        id = song['id']
-        song_data = get_song(id, lyrics)
-        if song_data:
-            songs.append(song_data)
+        return search_ids(hits, song_response, fields)
+    songs = get_songs([song['id'] for song in song_response], lyrics, fields)
+    prefetch_search(hits, song_response, songs)
     return songs
 
-def get_song(id,lyrics):
+def search_page(response, offset, limit):
+    hits = response['songs']['data']
+    return hits, helper.page(hits, offset, limit)
+
+def search_ids(hits, page, fields):
+    prefetch.songs(song['id'] for song in hits)
+    return [helper.project(song, fields) for song in page]
+
+def prefetch_search(hits, page, songs):
+    shown = set(song['id'] for song in page)
+    prefetch.songs(song['id'] for song in hits if song['id'] not in shown)
+    if songs:
+        prefetch.after_song(songs[0])
+
+def get_song(id,lyrics,fields=None):
+    lyrics, media_url = song_options(lyrics, fields)
+    song = cache.get_or_load('song', id, lyrics, lambda: _fetch_song(id, lyrics, media_url), helper.complete, media_url)
+    return found_song(song, fields)
+
+def song_options(lyrics, fields):
+    return lyrics and helper.wants(fields, 'lyrics'), helper.wants(fields, 'media_url')
+
+def found_song(song, fields):
+    if song is None:
+        return None
+    prefetch.after_song(song)
+    return helper.project(song, fields)
+
+def _fetch_song(id,lyrics,media_url=True):
+    song_details_base_url = endpoints.song_details_base_url+id
+    song_response = checked(upstream.get(song_details_base_url))
     try:
-        song_details_base_url = endpoints.song_details_base_url+id
-        song_response = requests.get(song_details_base_url).text.encode().decode('unicode-escape')
-        song_response = json.loads(song_response)
-        song_data = helper.format_song(song_response[id],lyrics)
-        if song_data:
-            return song_data
-    except:
+        song_data = details_song(helper.decode(song_response), id, media_url)
+    except Exception as e:
+        print(e)
         return None
+    if lyrics:
+        helper.add_lyrics([song_data])
+    return song_data
 
-def get_song_id(url):
-    res = requests.get(url, data=[('bitrate', '320')])
+def checked(response):
+    if policy.failed(response.status_code):
+        raise policy.Unavailable('upstream returned HTTP {}'.format(response.status_code))
+    return response
+
+def details_song(song_response, id, media_url=True):
+    return helper.format_song(index_songs(song_response)[id],False,media_url)
+
+def details_songs(song_response, ids, media_url=True):
+    song_response = index_songs(song_response)
+    songs = []
+    for id in ids:
+        if id not in song_response:
+            continue
+        try:
+            songs.append(helper.format_song(song_response[id],False,media_url))
+        except Exception:
+            print_exc()
+    return songs
+
+def get_songs(ids,lyrics,fields=None):
+    lyrics, media_url = song_options(lyrics, fields)
+    found, missing = cached_songs(ids, lyrics)
     try:
-        return res.text.split('"song":{"type":"')[1].split('","image":')[0].split('"id":"')[-1]
-    except IndexError:
-        return(res.text.split('"pid":"'))[1].split('","')[0]
+        fetched = _fetch_songs(missing, lyrics, media_url)
+    except UPSTREAM_ERRORS as e:
+        return stale_songs(ids, lyrics, fields, found, missing, e)
+    return merge_songs(ids, lyrics, fields, found, missing, fetched)
+
+def cached_songs(ids, lyrics):
+    found = {}
+    missing = []
+    for id in ids:
+        song = cache.fresh_value(cache.entry_key('song', id, lyrics))
+        if song is not None:
+            found[id] = song
+        elif id not in missing:
+            missing.append(id)
+    return found, missing
+
+def merge_songs(ids, lyrics, fields, found, missing, fetched):
+    for song in fetched:
+        if helper.complete(song):
+            cache.store(cache.entry_key('song', song['id'], lyrics), song)
+        found[song['id']] = song
+    for id in missing:
+        if id not in found:
+            song = cache.fallback(cache.entry_key('song', id, lyrics))
+            if song is not None:
+                found[id] = song
+    return [helper.project(found[id], fields) for id in ids if id in found]
+
+def stale_songs(ids, lyrics, fields, found, missing, error):
+    songs = merge_songs(ids, lyrics, fields, found, missing, [])
+    if any(id not in found for id in missing):
+        raise error
+    return songs
+
+def chunks(ids):
+    return [ids[i:i+SONG_BATCH_SIZE] for i in range(0, len(ids), SONG_BATCH_SIZE)]
+
+def _fetch_songs(ids,lyrics,media_url=True):
+    songs = []
+    for chunk in chunks(ids):
+        song_details_base_url = endpoints.song_details_base_url+','.join(chunk)
+        try:
+            song_response = helper.decode(checked(upstream.get(song_details_base_url)))
+        except UPSTREAM_ERRORS:
+            raise
+        except ValueError:
+            print_exc()
+            continue
+        songs.extend(details_songs(song_response, chunk, media_url))
+    if lyrics:
+        helper.add_lyrics(songs)
+    return songs
+
+def get_song_batch(items,lyrics,fields=None):
+    urls, ids = split_batch(items)
+    errors = {}
+    if urls:
+        with ThreadPoolExecutor(max_workers=BATCH_RESOLVE_WORKERS) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, get_song_id, url) for url in urls]
+            for item, future in zip(urls, futures):
+                try:
+                    ids[item] = future.result()
+                except Exception as e:
+                    errors[item] = str(e)
+    songs = get_songs(list(dict.fromkeys(ids.values())), lyrics, batch_fields(fields))
+    return batch_results(items, ids, songs, errors, fields)
+
+def split_batch(items):
+    inputs = list(dict.fromkeys(items))
+    return [item for item in inputs if is_url(item)], {item: item.strip() for item in inputs if not is_url(item)}
+
+def batch_fields(fields):
+    return None if fields is None else list(fields)+['id']
+
+def batch_results(items, ids, found, errors, fields):
+    songs = {song['id']: helper.project(song, fields) for song in found}
+    return [batch_result(item, ids.get(item), songs, errors) for item in items]
+
+def batch_result(item,id,songs,errors):
+    if item in errors:
+        return {"input": item, "status": False, "error": errors[item]}
+    if id not in songs:
+        return {"input": item, "status": False, "error": 'Invalid Song ID received!'}
+    return {"input": item, "status": True, "data": songs[id]}
+
+def is_url(item):
+    return item.strip().startswith('http')
 
-def get_album(album_id,lyrics):
-    songs_json = []
+def index_songs(song_response):
+    if 'songs' in song_response:
+        return {song['id']: song for song in song_response['songs']}
+    return song_response
+
+def get_song_id(url):
+    return resolve_id('song', url)
+
+def get_album(album_id,lyrics,fields=None,offset=0,limit=None):
+    return _collection('album', album_id, lyrics, fields, offset, limit, _fetch_album)
+
+def _fetch_album(album_id,lyrics,media_url=True):
+    response = checked(upstream.get(endpoints.album_details_base_url+album_id))
+    if response.status_code != 200:
+        return None
     try:
-        response = requests.get(endpoints.album_details_base_url+album_id)
-        if response.status_code == 200:
-            songs_json = response.text.encode().decode('unicode-escape')
-            songs_json = json.loads(songs_json)
-            return helper.format_album(songs_json,lyrics)
+        songs_json = helper.decode(response)
+        return helper.format_album(songs_json,lyrics,media_url)
     except Exception as e:
         print(e)
         return None
 
+def stream_album(album_id,lyrics):
+    return _stream('album', album_id, lyrics, endpoints.album_details_base_url, helper.format_album_info)
+
 def get_album_id(input_url):
-    res = requests.get(input_url)
-    try:
-        return res.text.split('"album_id":"')[1].split('"')[0]
-    except IndexError:
-        return res.text.split('"page_id","')[1].split('","')[0]
+    return resolve_id('album', input_url)
+
+def get_playlist(listId,lyrics,fields=None,offset=0,limit=None):
+    return _collection('playlist', listId, lyrics, fields, offset, limit, _fetch_playlist)
 
-def get_playlist(listId,lyrics):
+def _fetch_playlist(listId,lyrics,media_url=True):
+    response = checked(upstream.get(endpoints.playlist_details_base_url+listId))
+    if response.status_code != 200:
+        return None
     try:
-        response = requests.get(endpoints.playlist_details_base_url+listId)
-        if response.status_code == 200:
-            songs_json = response.text.encode().decode('unicode-escape')
-            songs_json = json.loads(songs_json)
-            return helper.format_playlist(songs_json,lyrics)
+        songs_json = helper.decode(response)
+        return helper.format_playlist(songs_json,lyrics,media_url)
+    except Exception:
+        print_exc()
+        return None
+
+def _collection(kind,id,lyrics,fields,offset,limit,fetch):
+    lyrics, media_url = song_options(lyrics, fields)
+    if not offset and limit is None:
+        data = cache.get_or_load(kind, id, lyrics, lambda: fetch(id, lyrics, media_url), helper.complete, media_url)
+        return helper.collection(data, data['songs'], fields) if data else None
+    # Pages share the lyrics-free entry; lyrics are only fetched for the page itself.
+    data = cache.get_or_load(kind, id, False, lambda: fetch(id, False, media_url), helper.complete, media_url)
+    if data is None:
         return None
+    songs = helper.page(data['songs'], offset, limit)
+    if lyrics:
+        songs = helper.add_lyrics([dict(song) for song in songs])
+    return helper.collection(data, songs, fields)
+
+def stream_playlist(listId,lyrics):
+    return _stream('playlist', listId, lyrics, endpoints.playlist_details_base_url, helper.format_playlist_info)
+
+def _stream(kind,id,lyrics,base_url,format_info):
+    key = cache.entry_key(kind, id, lyrics)
+    data = cache.fresh_value(key)
+    if data is not None:
+        return helper.header(data), iter(data['songs'])
+    try:
+        response = checked(upstream.get(base_url+id))
+        if response.status_code != 200:
+            return _stale_stream(key)
+        data = format_info(helper.decode(response))
+    except UPSTREAM_ERRORS:
+        stale = _stale_stream(key)
+        if stale is None:
+            raise
+        return stale
     except Exception:
         print_exc()
+        return _stale_stream(key)
+
+    def songs():
+        for song in helper.iter_songs(data['songs'],lyrics):
+            yield song
+        if helper.complete(data):
+            cache.store(key, data)
+    return helper.header(data), songs()
+
+def _stale_stream(key):
+    data = cache.fallback(key)
+    if data is None:
         return None
+    return helper.header(data), iter(data['songs'])
 
 def get_playlist_id(input_url):
-    res = requests.get(input_url).text
+    return resolve_id('playlist', input_url)
+
+def resolve_id(kind, url):
+    path = id_path(url)
+    if path is None:
+        return url.strip()
+    id = known_id(kind, path)
+    if id:
+        return id
+    id = _id_from_token(kind, path.rsplit('/', 1)[-1]) or _scrape_id(kind, endpoints.page_url(path))
+    if not id:
+        raise ValueError('Could not find the {} id in {}'.format(kind, path))
+    remember_id(kind, path, id)
+    return id
+
+def id_path(url):
+    url = url.strip()
+    if not url.startswith('http'):
+        return None
+    parts = urlsplit(url)
+    return parts.netloc.lower()+parts.path.rstrip('/')
+
+def known_id(kind, path):
+    id = memo_id(kind, path)
+    if id:
+        return id
+    id = store.get_id(kind, path)
+    if id:
+        _memo_id(kind, path, id)
+    return id
+
+def memo_id(kind, path):
+    token = path.rsplit('/', 1)[-1]
+    if kind != 'song' and token.isdigit():
+        return token
+    with _ids_lock:
+        id = _ids.get((kind, path))
+        if id:
+            _ids.move_to_end((kind, path))
+        return id
+
+def remember_id(kind, path, id):
+    _memo_id(kind, path, id)
+    store.put_id(kind, path, id)
+
+def _memo_id(kind, path, id):
+    with _ids_lock:
+        _ids[(kind, path)] = id
+        while len(_ids) > ID_CACHE_SIZE:
+            _ids.popitem(last=False)
+
+def id_from_token_data(kind, data):
+    if not isinstance(data, dict):
+        return None
+    if kind == 'song':
+        if data.get('songs'):
+            return data['songs'][0].get('id')
+        for key, value in data.items():
+            if isinstance(value, dict) and value.get('id') == key:
+                return key
+        return None
+    return data.get('albumid' if kind == 'album' else 'listid') or data.get('id')
+
+class IdScanner:
+    def __init__(self, kind):
+        self.patterns = ID_MARKERS[kind]
+        self.buffer = ''
+        self.fallback = None
+
+    def feed(self, chunk):
+        self.buffer = self.buffer[-SCRAPE_OVERLAP:]+chunk.decode('utf-8', 'ignore')
+        match = self.patterns[0].search(self.buffer)
+        if match:
+            return match.group(1)
+        if self.fallback is None:
+            match = self.patterns[1].search(self.buffer)
+            if match:
+                self.fallback = match.group(1)
+        return None
+
+def _id_from_token(kind, token):
     try:
-        return res.split('"type":"playlist","id":"')[1].split('"')[0]
-    except IndexError:
-        return res.split('"page_id","')[1].split('","')[0]
+        return id_from_token_data(kind, helper.decode(upstream.get(TOKEN_URLS[kind]+token)))
+    except Exception:
+        print_exc()
+        return None
+
+def _scrape_id(kind, url):
+    scanner = IdScanner(kind)
+    response = upstream.get(url, stream=True)
+    try:
+        for chunk in response.iter_content(chunk_size=SCRAPE_CHUNK):
+            id = scanner.feed(chunk)
+            if id:
+                return id
+    finally:
+        response.close()
+    return scanner.fallback
 
 def get_lyrics(id):
+    return cache.get_or_load('lyrics', id, False, lambda: _fetch_lyrics(id))
+
+def _fetch_lyrics(id):
     url = endpoints.lyrics_base_url+id
-    lyrics_json = requests.get(url).text
-    lyrics_text = json.loads(lyrics_json)
+    lyrics_text = helper.decode(upstream.get(url))
     return lyrics_text['lyrics']
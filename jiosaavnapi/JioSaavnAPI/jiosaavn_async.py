@@ -0,0 +1,423 @@
+import os
+import time
+import asyncio
+import functools
+import contextvars
+import httpx
+import endpoints
+import helper
+import cache
+import upstream
+import jiosaavn
+import metrics
+import singleflight
+import policy
+import store
+from concurrent.futures import ThreadPoolExecutor
+from traceback import print_exc
+
+MAX_CONNECTIONS = int(os.environ.get("ASYNC_UPSTREAM_MAX_CONNECTIONS", 200))
+
+UPSTREAM_ERRORS = (policy.Unavailable, httpx.HTTPError)
+
+_client = None
+_pools = {}
+_background = set()
+_disk_pool = ThreadPoolExecutor(max_workers=store.POOL_SIZE, thread_name_prefix='store')
+
+def client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=upstream.POOL_MAXSIZE),
+            timeout=httpx.Timeout(upstream.READ_TIMEOUT, connect=upstream.CONNECT_TIMEOUT),
+            follow_redirects=True
+        )
+    return _client
+
+def _pool(url):
+    url = httpx.URL(url)
+    key = (url.scheme, url.host)
+    if key not in _pools:
+        _pools[key] = {"requests": 0, "new_connections": 0}
+    return _pools[key]
+
+def _tracer(pool):
+    async def trace(event, info):
+        if event == 'connection.connect_tcp.complete':
+            pool["new_connections"] += 1
+    return trace
+
+def pool_stats():
+    stats = []
+    for (scheme, host), pool in list(_pools.items()):
+        total = pool["requests"]
+        new = pool["new_connections"]
+        stats.append({
+            "host": host,
+            "scheme": scheme,
+            "requests": total,
+            "new_connections": new,
+            "reused_connections": max(total-new, 0),
+            "max_connections": MAX_CONNECTIONS,
+            "maxsize": upstream.POOL_MAXSIZE
+        })
+    return stats
+
+async def close():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def get(url, stream=False):
+    endpoint = metrics.endpoint_type(url)
+    pool = _pool(url)
+    attempt = 0
+    while True:
+        wait = policy.admit(endpoint, retry=attempt > 0)
+        if wait:
+            await asyncio.sleep(wait)
+        started = time.perf_counter()
+        pool["requests"] += 1
+        try:
+            response = await client().send(client().build_request('GET', url, extensions={"trace": _tracer(pool)}), stream=stream)
+        except httpx.HTTPError as e:
+            metrics.observe_upstream(url, time.perf_counter()-started, type(e).__name__)
+            policy.record(endpoint, False)
+            delay = policy.retry_delay(attempt)
+            if delay is None:
+                raise
+        else:
+            metrics.observe_upstream(url, time.perf_counter()-started, metrics.upstream_error(response))
+            ok = not policy.failed(response.status_code)
+            policy.record(endpoint, ok)
+            delay = None if ok else policy.retry_delay(attempt)
+            if delay is None:
+                return response
+            await response.aclose()
+        await asyncio.sleep(delay)
+        attempt += 1
+
+async def _blocking(fn, *args):
+    call = functools.partial(contextvars.copy_context().run, fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(_disk_pool, call)
+
+async def _disk(keys, fn, *args):
+    if store.enabled() and not all(cache.in_memory(key) for key in keys):
+        return await _blocking(fn, *args)
+    return fn(*args)
+
+async def _refresh(key, loader, cacheable):
+    try:
+        cache.refreshed(key, await loader(), cacheable)
+    except Exception:
+        print_exc()
+    finally:
+        cache.release_refresh(key)
+
+async def _cached(kind, id, lyrics, loader, cacheable=lambda value: True, variant=None):
+    key = cache.entry_key(kind, id, lyrics)
+    value, fresh = await _disk([key], cache.peek, key)
+    if value is not None:
+        if not fresh and cache.claim_refresh(key):
+            task = asyncio.ensure_future(_refresh(key, loader, cacheable))
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+        return value
+    cache.count("misses")
+    value, shared = await singleflight.do_async(cache.flight_key(key, variant), lambda: _load(key, loader, cacheable))
+    if shared:
+        cache.count("coalesced")
+    return value
+
+async def _load(key, loader, cacheable):
+    try:
+        value = await loader()
+    except Exception as e:
+        return await _disk([key], cache.recover, key, e)
+    if value is None:
+        return await _disk([key], cache.fallback, key)
+    return cache.settle(key, value, cacheable)
+
+async def search_for_song(query,lyrics,songdata,fields=None,offset=0,limit=None):
+    if jiosaavn.is_song_link(query):
+        id = await get_song_id(query)
+        return await get_song(id, lyrics, fields)
+    key = jiosaavn.search_key(query, lyrics, songdata, fields, offset, limit)
+    result, shared = await singleflight.do_async(key, lambda: _search(query, lyrics, songdata, fields, offset, limit))
+    if shared:
+        cache.count("coalesced")
+    return result
+
+async def _search(query,lyrics,songdata,fields,offset,limit):
+    hits, song_response = jiosaavn.search_page(helper.decode(await get(endpoints.search_base_url+query)), offset, limit)
+    if not songdata:
+        return jiosaavn.search_ids(hits, song_response, fields)
+    songs = await get_songs([song['id'] for song in song_response], lyrics, fields)
+    jiosaavn.prefetch_search(hits, song_response, songs)
+    return songs
+
+async def get_song(id,lyrics,fields=None):
+    lyrics, media_url = jiosaavn.song_options(lyrics, fields)
+    song = await _cached('song', id, lyrics, lambda: _fetch_song(id, lyrics, media_url), helper.complete, media_url)
+    return jiosaavn.found_song(song, fields)
+
+async def _fetch_song(id,lyrics,media_url=True):
+    song_response = jiosaavn.checked(await get(endpoints.song_details_base_url+id))
+    try:
+        song_data = jiosaavn.details_song(helper.decode(song_response), id, media_url)
+    except Exception as e:
+        print(e)
+        return None
+    if lyrics:
+        await add_lyrics([song_data])
+    return song_data
+
+async def get_songs(ids,lyrics,fields=None):
+    lyrics, media_url = jiosaavn.song_options(lyrics, fields)
+    found, missing = await _disk([cache.entry_key('song', id, lyrics) for id in ids], jiosaavn.cached_songs, ids, lyrics)
+    try:
+        fetched = await _fetch_songs(missing, lyrics, media_url)
+    except UPSTREAM_ERRORS as e:
+        return await _disk([cache.entry_key('song', id, lyrics) for id in missing], jiosaavn.stale_songs, ids, lyrics, fields, found, missing, e)
+    return await _disk([cache.entry_key('song', id, lyrics) for id in missing], jiosaavn.merge_songs, ids, lyrics, fields, found, missing, fetched)
+
+async def get_song_batch(items,lyrics,fields=None):
+    urls, ids = jiosaavn.split_batch(items)
+    errors = {}
+    limit = asyncio.Semaphore(jiosaavn.BATCH_RESOLVE_WORKERS)
+
+    async def resolve(url):
+        async with limit:
+            return await get_song_id(url)
+    results = await asyncio.gather(*[resolve(url) for url in urls], return_exceptions=True)
+    for item, result in zip(urls, results):
+        if isinstance(result, Exception):
+            errors[item] = str(result)
+        else:
+            ids[item] = result
+    songs = await get_songs(list(dict.fromkeys(ids.values())), lyrics, jiosaavn.batch_fields(fields))
+    return jiosaavn.batch_results(items, ids, songs, errors, fields)
+
+async def _fetch_chunk(chunk,media_url=True):
+    try:
+        song_response = helper.decode(jiosaavn.checked(await get(endpoints.song_details_base_url+','.join(chunk))))
+    except UPSTREAM_ERRORS:
+        raise
+    except ValueError:
+        print_exc()
+        return []
+    return jiosaavn.details_songs(song_response, chunk, media_url)
+
+async def _fetch_songs(ids,lyrics,media_url=True):
+    chunks = await asyncio.gather(*[_fetch_chunk(chunk, media_url) for chunk in jiosaavn.chunks(ids)], return_exceptions=True)
+    for chunk in chunks:
+        if isinstance(chunk, Exception):
+            raise chunk
+    songs = [song for chunk in chunks for song in chunk]
+    if lyrics:
+        await add_lyrics(songs)
+    return songs
+
+async def add_lyrics(songs,deadline=None):
+    if deadline is None:
+        deadline = time.monotonic()+helper.LYRICS_DEADLINE
+    limit = asyncio.Semaphore(helper.LYRICS_WORKERS)
+
+    async def fetch(id):
+        async with limit:
+            return await get_lyrics(id)
+
+    tasks = {}
+    for song in songs:
+        if song['has_lyrics']=='true':
+            tasks[asyncio.ensure_future(fetch(song['id']))] = song
+        else:
+            song['lyrics'] = None
+    done = set()
+    if tasks:
+        done, _ = await asyncio.wait(tasks, timeout=max(deadline-time.monotonic(), 0))
+    for task, song in tasks.items():
+        song['lyrics'] = None
+        if task not in done:
+            task.cancel()
+            song['lyrics_timeout'] = True
+        elif task.exception() is not None:
+            print(task.exception())
+        else:
+            song['lyrics'] = task.result()
+    return songs
+
+async def get_album(album_id,lyrics,fields=None,offset=0,limit=None):
+    return await _collection('album', album_id, lyrics, fields, offset, limit, _fetch_album)
+
+async def _fetch_album(album_id,lyrics,media_url=True):
+    response = jiosaavn.checked(await get(endpoints.album_details_base_url+album_id))
+    if response.status_code != 200:
+        return None
+    try:
+        album = helper.format_album(helper.decode(response),False,media_url)
+    except Exception as e:
+        print(e)
+        return None
+    if lyrics:
+        await add_lyrics(album['songs'])
+    return album
+
+async def stream_album(album_id,lyrics):
+    return await _stream('album', album_id, lyrics, endpoints.album_details_base_url, helper.format_album_info)
+
+async def get_playlist(listId,lyrics,fields=None,offset=0,limit=None):
+    return await _collection('playlist', listId, lyrics, fields, offset, limit, _fetch_playlist)
+
+async def _fetch_playlist(listId,lyrics,media_url=True):
+    response = jiosaavn.checked(await get(endpoints.playlist_details_base_url+listId))
+    if response.status_code != 200:
+        return None
+    try:
+        playlist = helper.format_playlist(helper.decode(response),False,media_url)
+    except Exception:
+        print_exc()
+        return None
+    if lyrics:
+        await add_lyrics(playlist['songs'])
+    return playlist
+
+async def _collection(kind,id,lyrics,fields,offset,limit,fetch):
+    lyrics, media_url = jiosaavn.song_options(lyrics, fields)
+    if not offset and limit is None:
+        data = await _cached(kind, id, lyrics, lambda: fetch(id, lyrics, media_url), helper.complete, media_url)
+        return helper.collection(data, data['songs'], fields) if data else None
+    data = await _cached(kind, id, False, lambda: fetch(id, False, media_url), helper.complete, media_url)
+    if data is None:
+        return None
+    songs = helper.page(data['songs'], offset, limit)
+    if lyrics:
+        songs = await add_lyrics([dict(song) for song in songs])
+    return helper.collection(data, songs, fields)
+
+async def stream_playlist(listId,lyrics):
+    return await _stream('playlist', listId, lyrics, endpoints.playlist_details_base_url, helper.format_playlist_info)
+
+async def _stream(kind,id,lyrics,base_url,format_info):
+    key = cache.entry_key(kind, id, lyrics)
+    data = await _disk([key], cache.fresh_value, key)
+    if data is not None:
+        return helper.header(data), _songs(data)
+    try:
+        response = jiosaavn.checked(await get(base_url+id))
+        if response.status_code != 200:
+            return await _stale_stream(key)
+        data = format_info(helper.decode(response))
+    except UPSTREAM_ERRORS:
+        stale = await _stale_stream(key)
+        if stale is None:
+            raise
+        return stale
+    except Exception:
+        print_exc()
+        return await _stale_stream(key)
+
+    async def songs():
+        async for song in iter_songs(data['songs'],lyrics):
+            yield song
+        if helper.complete(data):
+            cache.store(key, data)
+    return helper.header(data), songs()
+
+async def _stale_stream(key):
+    data = await _disk([key], cache.fallback, key)
+    if data is None:
+        return None
+    return helper.header(data), _songs(data)
+
+async def _songs(data):
+    for song in data['songs']:
+        yield song
+
+async def iter_songs(songs,lyrics,deadline=None):
+    helper.decrypt_songs(songs)
+    tasks = []
+    if lyrics:
+        if deadline is None:
+            deadline = time.monotonic()+helper.LYRICS_DEADLINE
+        limit = asyncio.Semaphore(helper.LYRICS_WORKERS)
+
+        async def fetch(id):
+            async with limit:
+                return await get_lyrics(id)
+        tasks = [asyncio.ensure_future(fetch(song['id'])) if song['has_lyrics']=='true' else None for song in songs]
+    try:
+        for i, song in enumerate(songs):
+            song = songs[i] = helper.format_song(song,False)
+            if lyrics:
+                await _set_lyrics(song, tasks[i], deadline)
+            yield song
+    finally:
+        for task in tasks:
+            if task is not None:
+                task.cancel()
+
+async def _set_lyrics(song, task, deadline):
+    song['lyrics'] = None
+    if task is None:
+        return
+    done, _ = await asyncio.wait({task}, timeout=max(deadline-time.monotonic(), 0))
+    if not done:
+        task.cancel()
+        song['lyrics_timeout'] = True
+    elif task.exception() is not None:
+        print(task.exception())
+    else:
+        song['lyrics'] = task.result()
+
+async def get_lyrics(id):
+    return await _cached('lyrics', id, False, lambda: _fetch_lyrics(id))
+
+async def _fetch_lyrics(id):
+    lyrics_text = helper.decode(await get(endpoints.lyrics_base_url+id))
+    return lyrics_text['lyrics']
+
+async def get_song_id(url):
+    return await resolve_id('song', url)
+
+async def get_album_id(input_url):
+    return await resolve_id('album', input_url)
+
+async def get_playlist_id(input_url):
+    return await resolve_id('playlist', input_url)
+
+async def resolve_id(kind, url):
+    path = jiosaavn.id_path(url)
+    if path is None:
+        return url.strip()
+    id = jiosaavn.memo_id(kind, path)
+    if not id and store.enabled():
+        id = await _blocking(jiosaavn.known_id, kind, path)
+    if id:
+        return id
+    id = await _id_from_token(kind, path.rsplit('/', 1)[-1]) or await _scrape_id(kind, endpoints.page_url(path))
+    if not id:
+        raise ValueError('Could not find the {} id in {}'.format(kind, path))
+    jiosaavn.remember_id(kind, path, id)
+    return id
+
+async def _id_from_token(kind, token):
+    try:
+        return jiosaavn.id_from_token_data(kind, helper.decode(await get(jiosaavn.TOKEN_URLS[kind]+token)))
+    except Exception:
+        print_exc()
+        return None
+
+async def _scrape_id(kind, url):
+    scanner = jiosaavn.IdScanner(kind)
+    response = await get(url, stream=True)
+    try:
+        async for chunk in response.aiter_bytes(jiosaavn.SCRAPE_CHUNK):
+            id = scanner.feed(chunk)
+            if id:
+                return id
+    finally:
+        await response.aclose()
+    return scanner.fallback
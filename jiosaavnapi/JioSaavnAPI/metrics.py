@@ -0,0 +1,136 @@
+import threading
+from bisect import bisect_left
+from urllib.parse import urlsplit, parse_qs
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CALLS = {
+    'autocomplete.get': 'search',
+    'song.getDetails': 'song',
+    'content.getAlbumDetails': 'album',
+    'playlist.getDetails': 'playlist',
+    'lyrics.getLyrics': 'lyrics',
+    'webapi.get': 'token'
+}
+
+COUNTERS = ('hits', 'stale_hits', 'misses', 'evictions', 'refreshes', 'coalesced', 'disk_hits', 'stale_fallbacks', 'retries', 'retries_denied', 'rate_limited', 'rejected')
+
+_lock = threading.Lock()
+_requests = {}
+_request_latency = {}
+_in_flight = {}
+_upstream_latency = {}
+_upstream_errors = {}
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0]*(len(BUCKETS)+1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+def endpoint_type(url):
+    parts = urlsplit(url)
+    if parts.path.endswith('/api.php'):
+        call = parse_qs(parts.query).get('__call', [''])[0]
+        return CALLS.get(call, call or 'api')
+    return 'scrape'
+
+def _observe(histograms, key, seconds):
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = Histogram()
+    histogram.observe(seconds)
+
+def request_started(route):
+    with _lock:
+        _in_flight[route] = _in_flight.get(route, 0)+1
+
+def request_finished(route):
+    with _lock:
+        _in_flight[route] = _in_flight.get(route, 1)-1
+
+def in_flight():
+    with _lock:
+        return sum(_in_flight.values())
+
+def observe_request(route, method, status, seconds):
+    with _lock:
+        key = (route, method, str(status))
+        _requests[key] = _requests.get(key, 0)+1
+        _observe(_request_latency, route, seconds)
+
+def observe_upstream(url, seconds, error=None):
+    endpoint = endpoint_type(url)
+    with _lock:
+        _observe(_upstream_latency, endpoint, seconds)
+        if error:
+            key = (endpoint, error)
+            _upstream_errors[key] = _upstream_errors.get(key, 0)+1
+
+def upstream_error(response):
+    if response.status_code >= 400:
+        return str(response.status_code)
+    return None
+
+def _labels(**labels):
+    return '{'+','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in labels.items())+'}'
+
+def _histogram_lines(name, histograms, label):
+    lines = ['# TYPE {} histogram'.format(name)]
+    for key, histogram in sorted(histograms.items()):
+        total = 0
+        for bound, count in zip(BUCKETS+('+Inf',), histogram.counts):
+            total += count
+            lines.append('{}_bucket{} {}'.format(name, _labels(**{label: key, 'le': bound}), total))
+        lines.append('{}_sum{} {}'.format(name, _labels(**{label: key}), histogram.sum))
+        lines.append('{}_count{} {}'.format(name, _labels(**{label: key}), histogram.count))
+    return lines
+
+def render(cache_stats=None, pool_stats=None, policy_stats=None):
+    with _lock:
+        lines = ['# TYPE jiosaavn_requests_total counter']
+        for (route, method, status), count in sorted(_requests.items()):
+            lines.append('jiosaavn_requests_total{} {}'.format(_labels(route=route, method=method, status=status), count))
+        lines += _histogram_lines('jiosaavn_request_duration_seconds', _request_latency, 'route')
+        lines.append('# TYPE jiosaavn_requests_in_flight gauge')
+        for route, count in sorted(_in_flight.items()):
+            lines.append('jiosaavn_requests_in_flight{} {}'.format(_labels(route=route), count))
+        lines += _histogram_lines('jiosaavn_upstream_duration_seconds', _upstream_latency, 'endpoint')
+        lines.append('# TYPE jiosaavn_upstream_errors_total counter')
+        for (endpoint, error), count in sorted(_upstream_errors.items()):
+            lines.append('jiosaavn_upstream_errors_total{} {}'.format(_labels(endpoint=endpoint, error=error), count))
+    for name, value in sorted((cache_stats or {}).items()):
+        if isinstance(value, dict):
+            for part, number in sorted(value.items()):
+                if isinstance(number, (int, float)) and not isinstance(number, bool):
+                    lines.append('# TYPE jiosaavn_cache_{}_{} gauge'.format(name, part))
+                    lines.append('jiosaavn_cache_{}_{} {}'.format(name, part, number))
+            continue
+        kind = 'counter' if name in COUNTERS else 'gauge'
+        metric = 'jiosaavn_cache_{}{}'.format(name, '_total' if kind == 'counter' else '')
+        lines.append('# TYPE {} {}'.format(metric, kind))
+        lines.append('{} {}'.format(metric, value))
+    for name, value in sorted((policy_stats or {}).items()):
+        if name == 'breakers':
+            lines.append('# TYPE jiosaavn_upstream_breaker_state gauge')
+            for endpoint, state in sorted(value.items()):
+                for known in ('closed', 'open', 'half_open'):
+                    lines.append('jiosaavn_upstream_breaker_state{} {}'.format(_labels(endpoint=endpoint, state=known), int(state == known)))
+            continue
+        kind = 'counter' if name in COUNTERS else 'gauge'
+        metric = 'jiosaavn_upstream_{}{}'.format(name, '_total' if kind == 'counter' else '')
+        lines.append('# TYPE {} {}'.format(metric, kind))
+        lines.append('{} {}'.format(metric, value))
+    for pool in pool_stats or []:
+        host = pool.get('host', '')
+        for name, value in sorted(pool.items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append('jiosaavn_upstream_pool_{}{} {}'.format(name, _labels(host=host), value))
+    return '\n'.join(lines)+'\n'
@@ -0,0 +1,110 @@
+import os
+import time
+import random
+import threading
+
+RATE = float(os.environ.get("UPSTREAM_RATE", 50))
+BURST = float(os.environ.get("UPSTREAM_BURST", 100))
+MAX_WAIT = float(os.environ.get("UPSTREAM_MAX_WAIT", 2))
+RETRIES = int(os.environ.get("UPSTREAM_RETRIES", 2))
+RETRY_BUDGET_RATIO = float(os.environ.get("UPSTREAM_RETRY_BUDGET_RATIO", 0.1))
+RETRY_BUDGET_MAX = float(os.environ.get("UPSTREAM_RETRY_BUDGET_MAX", 20))
+BACKOFF_BASE = float(os.environ.get("UPSTREAM_BACKOFF_BASE", 0.1))
+BACKOFF_CAP = float(os.environ.get("UPSTREAM_BACKOFF_CAP", 2))
+BREAKER_FAILURES = int(os.environ.get("UPSTREAM_BREAKER_FAILURES", 5))
+BREAKER_COOLDOWN = float(os.environ.get("UPSTREAM_BREAKER_COOLDOWN", 30))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_lock = threading.Lock()
+_tokens = BURST
+_refilled = time.monotonic()
+_budget = RETRY_BUDGET_MAX
+_breakers = {}
+_counters = {
+    "retries": 0,
+    "retries_denied": 0,
+    "rate_limited": 0,
+    "rejected": 0
+}
+
+class Unavailable(Exception):
+    pass
+
+class Breaker:
+    __slots__ = ('state', 'failures', 'opened_at', 'probing')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+def _breaker(endpoint):
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        breaker = _breakers[endpoint] = Breaker()
+    return breaker
+
+def admit(endpoint, retry=False):
+    global _tokens, _refilled, _budget
+    now = time.monotonic()
+    with _lock:
+        breaker = _breaker(endpoint)
+        if breaker.state != CLOSED and now-breaker.opened_at >= BREAKER_COOLDOWN:
+            breaker.state = HALF_OPEN
+            breaker.probing = False
+        if breaker.state == OPEN or (breaker.state == HALF_OPEN and breaker.probing):
+            _counters["rejected"] += 1
+            raise Unavailable('{} upstream circuit is open'.format(endpoint))
+        if not retry:
+            _budget = min(_budget+RETRY_BUDGET_RATIO, RETRY_BUDGET_MAX)
+        _tokens = min(_tokens+(now-_refilled)*RATE, BURST)
+        _refilled = now
+        wait = (1-_tokens)/RATE if _tokens < 1 else 0.0
+        if wait > MAX_WAIT:
+            _counters["rate_limited"] += 1
+            raise Unavailable('{} upstream rate limit exceeded'.format(endpoint))
+        _tokens -= 1
+        if breaker.state == HALF_OPEN:
+            breaker.probing = True
+            breaker.opened_at = now
+        return wait
+
+def record(endpoint, ok):
+    with _lock:
+        breaker = _breaker(endpoint)
+        if ok:
+            breaker.state = CLOSED
+            breaker.failures = 0
+        else:
+            breaker.failures += 1
+            if breaker.state == HALF_OPEN or breaker.failures >= BREAKER_FAILURES:
+                breaker.state = OPEN
+                breaker.opened_at = time.monotonic()
+        breaker.probing = False
+
+def retry_delay(attempt):
+    global _budget
+    if attempt >= RETRIES:
+        return None
+    with _lock:
+        if _budget < 1:
+            _counters["retries_denied"] += 1
+            return None
+        _budget -= 1
+        _counters["retries"] += 1
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE*2**attempt))
+
+def failed(status_code):
+    return status_code >= 500 or status_code == 429
+
+def stats():
+    with _lock:
+        stats = dict(_counters)
+        stats["tokens"] = _tokens
+        stats["retry_budget"] = _budget
+        stats["breakers"] = {endpoint: breaker.state for endpoint, breaker in _breakers.items()}
+        return stats
@@ -0,0 +1,122 @@
+import os
+import time
+import queue
+import threading
+import cache
+import metrics
+import jiosaavn
+from traceback import print_exc
+
+ENABLED = os.environ.get("PREFETCH", "false").lower() not in ("", "0", "false", "no")
+QUEUE_SIZE = int(os.environ.get("PREFETCH_QUEUE_SIZE", 256))
+PER_MINUTE = int(os.environ.get("PREFETCH_PER_MINUTE", 120))
+MAX_FOREGROUND = int(os.environ.get("PREFETCH_MAX_FOREGROUND", 4))
+SONG_LIMIT = int(os.environ.get("PREFETCH_SONG_LIMIT", 20))
+YIELD_INTERVAL = 0.05
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_queued = set()
+_lock = threading.Lock()
+_started = False
+_window = [0.0, 0]
+_counters = {
+    "queued": 0,
+    "dropped": 0,
+    "skipped": 0,
+    "over_budget": 0,
+    "prefetched": 0
+}
+
+def _count(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+def _start():
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_worker, name='prefetch', daemon=True).start()
+
+def _submit(kind, ids):
+    if not ENABLED:
+        return
+    ids = [id for id in dict.fromkeys(ids) if id and not cached(kind, id)]
+    with _lock:
+        ids = [id for id in ids if (kind, id) not in _queued]
+        if not ids:
+            return
+        _queued.update((kind, id) for id in ids)
+    _start()
+    try:
+        _queue.put_nowait((kind, ids))
+        _count("queued", len(ids))
+    except queue.Full:
+        _release(kind, ids)
+        _count("dropped", len(ids))
+
+def _release(kind, ids):
+    with _lock:
+        _queued.difference_update((kind, id) for id in ids)
+
+def album(album_id):
+    if album_id:
+        _submit('album', [str(album_id)])
+
+def songs(ids):
+    _submit('song', list(ids)[:SONG_LIMIT])
+
+def after_song(song):
+    if song is not None:
+        album(song.get('albumid'))
+
+def cached(kind, id):
+    return cache.in_memory(cache.entry_key(kind, id, False), fresh=True)
+
+def stored(kind, id):
+    return cache.on_disk(cache.entry_key(kind, id, False))
+
+def _spend(cost):
+    now = time.monotonic()
+    with _lock:
+        if now-_window[0] >= 60:
+            _window[0] = now
+            _window[1] = 0
+        if _window[1]+cost > PER_MINUTE:
+            return False
+        _window[1] += cost
+        return True
+
+def _worker():
+    while True:
+        kind, ids = _queue.get()
+        try:
+            while metrics.in_flight() > MAX_FOREGROUND:
+                time.sleep(YIELD_INTERVAL)
+            missing = [id for id in ids if not cached(kind, id) and not stored(kind, id)]
+            _count("skipped", len(ids)-len(missing))
+            if not missing:
+                continue
+            cost = 1 if kind == 'album' else -(-len(missing)//jiosaavn.SONG_BATCH_SIZE)
+            if not _spend(cost):
+                _count("over_budget", len(missing))
+                continue
+            if kind == 'album':
+                jiosaavn.get_album(missing[0], False)
+            else:
+                jiosaavn.get_songs(missing, False)
+            _count("prefetched", len(missing))
+        except Exception:
+            print_exc()
+        finally:
+            _release(kind, ids)
+
+def stats():
+    with _lock:
+        stats = dict(_counters)
+        stats["enabled"] = ENABLED
+        stats["pending"] = _queue.qsize()
+        stats["spent_this_minute"] = _window[1]
+        stats["per_minute"] = PER_MINUTE
+        return stats
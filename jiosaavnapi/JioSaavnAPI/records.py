@@ -0,0 +1,131 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SONG_FIELDS = (
+    'id', 'type', 'song', 'album', 'year', 'music', 'music_id', 'primary_artists', 'primary_artists_id',
+    'featured_artists', 'featured_artists_id', 'singers', 'starring', 'image', 'label', 'albumid', 'language',
+    'origin', 'play_count', 'copyright_text', '320kbps', 'is_dolby_content', 'explicit_content', 'has_lyrics',
+    'lyrics_snippet', 'encrypted_media_url', 'media_preview_url', 'perma_url', 'album_url', 'duration',
+    'release_date', 'media_url', 'lyrics', 'lyrics_timeout'
+)
+ALBUM_FIELDS = (
+    'id', 'title', 'name', 'year', 'release_date', 'primary_artists', 'primary_artists_id', 'albumid',
+    'perma_url', 'image', 'songs'
+)
+PLAYLIST_FIELDS = (
+    'listid', 'listname', 'firstname', 'lastname', 'username', 'uid', 'follower_count', 'fan_count',
+    'list_count', 'lastupdated', 'perma_url', 'image', 'type', 'subheading', 'songs'
+)
+
+_MISSING = object()
+
+def _slots(fields):
+    return {key: key if key.isidentifier() else '_'+key for key in fields}
+
+class Record:
+    __slots__ = ()
+    SLOTS = {}
+
+    def __init__(self, data=None):
+        for key, value in (data or {}).items():
+            slot = self.SLOTS.get(key)
+            if slot is not None:
+                setattr(self, slot, value)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self.SLOTS[key])
+        except (KeyError, AttributeError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        slot = self.SLOTS.get(key)
+        if slot is None:
+            raise KeyError(key)
+        setattr(self, slot, value)
+
+    def __contains__(self, key):
+        slot = self.SLOTS.get(key)
+        return slot is not None and hasattr(self, slot)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.to_dict())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [key for key, slot in self.SLOTS.items() if hasattr(self, slot)]
+
+    def items(self):
+        items = []
+        for key, slot in self.SLOTS.items():
+            value = getattr(self, slot, _MISSING)
+            if value is not _MISSING:
+                items.append((key, value))
+        return items
+
+    def to_dict(self):
+        return dict(self.items())
+
+class Song(Record):
+    SLOTS = _slots(SONG_FIELDS)
+    __slots__ = tuple(SLOTS.values())
+
+class Album(Record):
+    SLOTS = _slots(ALBUM_FIELDS)
+    __slots__ = tuple(SLOTS.values())
+
+class Playlist(Record):
+    SLOTS = _slots(PLAYLIST_FIELDS)
+    __slots__ = tuple(SLOTS.values())
+
+COLLECTIONS = {'album': Album, 'playlist': Playlist}
+
+def restore(kind, value):
+    if not isinstance(value, dict):
+        return value
+    if kind == 'song':
+        return Song(value)
+    if kind in COLLECTIONS:
+        record = COLLECTIONS[kind](value)
+        if 'songs' in record:
+            record['songs'] = [Song(song) for song in record['songs']]
+        return record
+    return value
+
+def _default(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError('{} is not JSON serializable'.format(type(value).__name__))
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(value, default=_default, sort_keys=True, separators=(',', ':')).encode()
+
+def json_provider(base):
+    class RecordJSONProvider(base):
+        def dumps(self, obj, **kwargs):
+            return dumps(obj).decode()
+    return RecordJSONProvider
@@ -0,0 +1,66 @@
+import os
+import cache
+import policy
+import prefetch
+
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 1000))
+HOME_URL = "https://cyberboysumanjay.github.io/JioSaavnAPI/"
+METRICS_MIMETYPE = 'text/plain; version=0.0.4'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+UNAVAILABLE = 'The song service is unavailable right now, please try again later!'
+NO_STORE = {"Cache-Control": 'no-store'}
+
+def error(message):
+    return {
+        "status": False,
+        "error": message
+    }
+
+def enabled(value):
+    return bool(value and value.lower()!='false')
+
+def lyrics(args):
+    return enabled(args.get('lyrics'))
+
+def songdata(args):
+    songdata_ = args.get('songdata')
+    return not (songdata_ and songdata_.lower()!='true')
+
+def streamed(args):
+    return args.get('stream') == 'ndjson'
+
+def bypass(args, headers):
+    return enabled(args.get('nocache')) or 'no-cache' in headers.get('Cache-Control', '').lower()
+
+def stats(pool):
+    return {
+        "status": True,
+        "pool": pool,
+        "cache": cache.stats(),
+        "upstream": policy.stats(),
+        "prefetch": prefetch.stats()
+    }
+
+def batch(body, args, fields):
+    if isinstance(body, list):
+        body = {"items": body}
+    if not isinstance(body, dict) or not isinstance(body.get('items'), list) or not all(isinstance(item, str) and item.strip() for item in body['items']):
+        raise ValueError('A JSON list of song IDs or links is required!')
+    if len(body['items']) > BATCH_MAX_ITEMS:
+        raise ValueError('At most {} songs can be requested at once!'.format(BATCH_MAX_ITEMS))
+    fields = body.get('fields', fields)
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()] or None
+    return body['items'], body.get('lyrics') in (True, 'true') or lyrics(args), fields
+
+def result_kind(query):
+    if 'saavn' not in query:
+        return 'search'
+    if '/song/' in query:
+        return 'song'
+    if '/album/' in query:
+        return 'album'
+    return 'playlist'
+
+def is_link(query):
+    return 'http' in query and 'saavn' in query
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+
+_calls = {}
+_lock = threading.Lock()
+_tasks = {}
+
+class Call:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+def do(key, fn):
+    with _lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = Call()
+    if not leader:
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.value, True
+    try:
+        call.value = fn()
+        return call.value, False
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _calls.pop(key, None)
+        call.event.set()
+
+async def do_async(key, fn):
+    task = _tasks.get(key)
+    if task is not None:
+        return await asyncio.shield(task), True
+    task = _tasks[key] = asyncio.ensure_future(fn())
+    task.add_done_callback(lambda done: _tasks.pop(key, None) if _tasks.get(key) is done else None)
+    return await asyncio.shield(task), False
+
+def in_flight():
+    with _lock:
+        return len(_calls)+len(_tasks)
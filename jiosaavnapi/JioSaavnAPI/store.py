@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from traceback import print_exc
+import records
+
+PATH = os.environ.get("STORE_PATH", "")
+MAX_BYTES = int(os.environ.get("STORE_MAX_BYTES", 512*1024*1024))
+MAX_AGE = float(os.environ.get("STORE_MAX_AGE", 7*24*3600))
+COMPACT_INTERVAL = float(os.environ.get("STORE_COMPACT_INTERVAL", 300))
+BUSY_TIMEOUT = float(os.environ.get("STORE_BUSY_TIMEOUT", 5))
+POOL_SIZE = int(os.environ.get("STORE_POOL_SIZE", 4))
+WRITE_QUEUE_SIZE = int(os.environ.get("STORE_WRITE_QUEUE_SIZE", 10000))
+WRITE_BATCH = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_accessed_at ON records (accessed_at);
+CREATE TABLE IF NOT EXISTS ids (
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    id TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (kind, path)
+);
+"""
+
+_pool = queue.LifoQueue()
+_writes = OrderedDict()
+_written = threading.Condition()
+_touched = set()
+_lock = threading.Lock()
+_ready = False
+_dropped = 0
+
+def enabled():
+    return _ready
+
+def _open():
+    connection = sqlite3.connect(PATH, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+def _setup():
+    global _ready
+    try:
+        connection = _open()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        _pool.put(connection)
+        for _ in range(POOL_SIZE-1):
+            _pool.put(_open())
+        writer = _open()
+    except sqlite3.Error:
+        print_exc()
+        return
+    _ready = True
+    threading.Thread(target=_writer, args=(writer,), daemon=True).start()
+    threading.Thread(target=_compactor, daemon=True).start()
+
+@contextmanager
+def _connection():
+    connection = _pool.get()
+    try:
+        yield connection
+    finally:
+        _pool.put(connection)
+
+def record_key(key):
+    return json.dumps(list(key))
+
+def get(key):
+    if not enabled():
+        return None, None
+    try:
+        with _connection() as connection:
+            row = connection.execute('SELECT value, stored_at FROM records WHERE key = ?', (record_key(key),)).fetchone()
+    except sqlite3.Error:
+        print_exc()
+        return None, None
+    if row is None:
+        return None, None
+    with _lock:
+        _touched.add(record_key(key))
+    return records.restore(key[0], json.loads(row[0])), time.time()-row[1]
+
+def age(key):
+    if not enabled():
+        return None
+    try:
+        with _connection() as connection:
+            row = connection.execute('SELECT stored_at FROM records WHERE key = ?', (record_key(key),)).fetchone()
+    except sqlite3.Error:
+        print_exc()
+        return None
+    return time.time()-row[0] if row else None
+
+def put(key, value):
+    if enabled():
+        _queue(('record', record_key(key), value, time.time()))
+
+def _queue(write):
+    global _dropped
+    slot = (write[0] == 'id', write[1])
+    with _written:
+        if slot in _writes:
+            del _writes[slot]
+        elif len(_writes) >= WRITE_QUEUE_SIZE:
+            _dropped += 1
+            return
+        _writes[slot] = write
+        _written.notify()
+
+def get_id(kind, path):
+    if not enabled():
+        return None
+    try:
+        with _connection() as connection:
+            row = connection.execute('SELECT id FROM ids WHERE kind = ? AND path = ?', (kind, path)).fetchone()
+    except sqlite3.Error:
+        print_exc()
+        return None
+    return row[0] if row else None
+
+def put_id(kind, path, id):
+    if enabled():
+        _queue(('id', (kind, path), id, time.time()))
+
+def _apply(connection, write):
+    kind, key, value, now = write
+    if kind == 'record':
+        encoded = records.dumps(value).decode()
+        connection.execute(
+            'INSERT OR REPLACE INTO records (key, value, size, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+            (key, encoded, len(encoded), now, now))
+    else:
+        connection.execute('INSERT OR REPLACE INTO ids (kind, path, id, stored_at) VALUES (?, ?, ?, ?)', key+(value, now))
+
+def _writer(connection):
+    while True:
+        with _written:
+            while not _writes:
+                _written.wait()
+            writes = [_writes.popitem(last=False)[1] for _ in range(min(len(_writes), WRITE_BATCH))]
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            for write in writes:
+                _apply(connection, write)
+            connection.execute('COMMIT')
+        except Exception:
+            print_exc()
+            try:
+                connection.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+
+def compact(max_age=MAX_AGE):
+    with _connection() as connection:
+        _compact(connection, max_age)
+
+def _compact(connection, max_age):
+    with _lock:
+        touched = list(_touched)
+        _touched.clear()
+    now = time.time()
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.executemany('UPDATE records SET accessed_at = ? WHERE key = ?', [(now, key) for key in touched])
+        if max_age is not None:
+            connection.execute('DELETE FROM records WHERE stored_at < ?', (now-max_age,))
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM records').fetchone()[0]
+        if total > MAX_BYTES:
+            evict = []
+            for key, size in connection.execute('SELECT key, size FROM records ORDER BY accessed_at'):
+                if total <= MAX_BYTES:
+                    break
+                evict.append((key,))
+                total -= size
+            connection.executemany('DELETE FROM records WHERE key = ?', evict)
+        connection.execute('COMMIT')
+    except Exception:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+def _compactor():
+    while True:
+        time.sleep(COMPACT_INTERVAL)
+        try:
+            compact()
+        except Exception:
+            print_exc()
+
+def stats():
+    if not enabled():
+        return {"enabled": False}
+    try:
+        with _connection() as connection:
+            count, size = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM records').fetchone()
+            ids = connection.execute('SELECT COUNT(*) FROM ids').fetchone()[0]
+    except sqlite3.Error:
+        print_exc()
+        return {"enabled": True}
+    return {
+        "enabled": True,
+        "records": count,
+        "bytes": size,
+        "ids": ids,
+        "pending_writes": len(_writes),
+        "dropped_writes": _dropped,
+        "max_bytes": MAX_BYTES,
+        "pool_size": POOL_SIZE
+    }
+
+if PATH:
+    _setup()
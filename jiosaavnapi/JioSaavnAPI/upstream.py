@@ -0,0 +1,79 @@
+import os
+import time
+import threading
+import requests
+import metrics
+import policy
+from requests.adapters import HTTPAdapter
+
+POOL_CONNECTIONS = int(os.environ.get("UPSTREAM_POOL_CONNECTIONS", 4))
+POOL_MAXSIZE = int(os.environ.get("UPSTREAM_POOL_MAXSIZE", 32))
+CONNECT_TIMEOUT = float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.environ.get("UPSTREAM_READ_TIMEOUT", 10))
+
+_session = None
+_lock = threading.Lock()
+
+def session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=False)
+                s.mount('https://', adapter)
+                s.mount('http://', adapter)
+                _session = s
+    return _session
+
+def get(url, **kwargs):
+    kwargs.setdefault('timeout', (CONNECT_TIMEOUT, READ_TIMEOUT))
+    endpoint = metrics.endpoint_type(url)
+    attempt = 0
+    while True:
+        wait = policy.admit(endpoint, retry=attempt > 0)
+        if wait:
+            time.sleep(wait)
+        started = time.perf_counter()
+        try:
+            response = session().get(url, **kwargs)
+        except requests.RequestException as e:
+            metrics.observe_upstream(url, time.perf_counter()-started, type(e).__name__)
+            policy.record(endpoint, False)
+            delay = policy.retry_delay(attempt)
+            if delay is None:
+                raise
+        else:
+            metrics.observe_upstream(url, time.perf_counter()-started, metrics.upstream_error(response))
+            ok = not policy.failed(response.status_code)
+            policy.record(endpoint, ok)
+            delay = None if ok else policy.retry_delay(attempt)
+            if delay is None:
+                return response
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+
+def pool_stats():
+    stats = []
+    if _session is None:
+        return stats
+    adapter = _session.get_adapter('https://')
+    pools = adapter.poolmanager.pools
+    for key in list(pools.keys()):
+        try:
+            pool = pools[key]
+        except KeyError:
+            continue
+        new = pool.num_connections
+        total = pool.num_requests
+        stats.append({
+            "host": pool.host,
+            "scheme": pool.scheme,
+            "requests": total,
+            "new_connections": new,
+            "reused_connections": max(total-new, 0),
+            "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn) if pool.pool else 0,
+            "maxsize": POOL_MAXSIZE
+        })
+    return stats
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import base64
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'JioSaavnAPI'))
+
+from pyDes import des, ECB, PAD_PKCS5
+import decrypt
+
+def sample_urls(count):
+    cipher = des(decrypt.KEY, ECB, b"\0\0\0\0\0\0\0\0", pad=None, padmode=PAD_PKCS5)
+    urls = []
+    for i in range(count):
+        url = "https://aac.saavncdn.com/{:03d}/{:032x}_96.mp4".format(i % 1000, i)
+        urls.append(base64.b64encode(cipher.encrypt(url.encode(), padmode=PAD_PKCS5)).decode())
+    return urls
+
+def legacy(urls):
+    out = []
+    for url in urls:
+        des_cipher = des(b"38346591", ECB, b"\0\0\0\0\0\0\0\0", pad=None, padmode=PAD_PKCS5)
+        dec_url = des_cipher.decrypt(base64.b64decode(url.strip()), padmode=PAD_PKCS5).decode('utf-8')
+        out.append(dec_url.replace("_96.mp4", "_320.mp4"))
+    return out
+
+def engine(name):
+    backend = decrypt.backend(name)
+    def run(urls):
+        plain = backend.decrypt([base64.b64decode(url.strip()) for url in urls])
+        return [url.decode('utf-8').replace("_96.mp4", "_320.mp4") for url in plain]
+    return run
+
+def timeit(fn, urls, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(urls)
+        elapsed = time.perf_counter()-start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare media URL decryption backends.")
+    parser.add_argument('--count', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    urls = sample_urls(args.count)
+    expected = legacy(urls)
+    runs = [('legacy (new pyDes cipher per url)', legacy), ('pydes (shared cipher)', engine('pydes'))]
+    if decrypt.DES is not None:
+        runs.append(('pycryptodome (batched)', engine('pycryptodome')))
+    else:
+        print("pycryptodome is not installed, skipping the C backend")
+
+    for name, fn in runs:
+        assert fn(urls) == expected, name
+        elapsed = timeit(fn, urls, args.repeat)
+        print("{:<36} {:>10.2f} ms  {:>10.1f} urls/s".format(name, elapsed*1000, args.count/elapsed))
+
+if __name__ == '__main__':
+    main()
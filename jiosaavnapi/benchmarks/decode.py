@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'JioSaavnAPI'))
+
+import helper
+
+FIELDS = ('song', 'music', 'singers', 'starring', 'album', 'primary_artists', 'copyright_text')
+
+class Response:
+    def __init__(self, content):
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+def payload(count):
+    songs = []
+    for i in range(count):
+        songs.append({
+            "id": "id{}".format(i),
+            "song": "Tum Hi Ho &quot;Unplugged&quot; {} &amp; Reprise".format(i),
+            "music": "Mithoon &amp; Ankit Tiwari",
+            "singers": "Arijit Singh, Shreya Ghoshal",
+            "starring": "Aditya Roy Kapur, Shraddha Kapoor",
+            "album": "Aashiqui 2 (Original Motion Picture Soundtrack) &#039;{}&#039;".format(i),
+            "primary_artists": "Arijit Singh &amp; Mithoon",
+            "copyright_text": "&copy; 2013 T-Series – Café Niño",
+            "perma_url": "https://www.jiosaavn.com/song/tum-hi-ho/{}".format(i),
+            "lyrics_snippet": "Hum tere bin ab reh nahi sakte, तेरे बिना क्या वजूद मेरा"
+        })
+    data = {"listname": "Top 500 &amp; More", "firstname": "JioSaavn", "songs": songs}
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+def legacy(response):
+    data = json.loads(response.text.encode().decode('unicode-escape'))
+    for song in data['songs']:
+        for field in FIELDS:
+            song[field] = song[field].encode().decode().replace("&quot;","'").replace("&amp;", "&").replace("&#039;", "'")
+        song['copyright_text'] = song['copyright_text'].replace("&copy;","©")
+    return data
+
+def current(response):
+    data = helper.decode(response)
+    for song in data['songs']:
+        for field in FIELDS:
+            song[field] = helper.format(song[field])
+    return data
+
+def timeit(fn, response, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(response)
+        elapsed = time.perf_counter()-start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare upstream response decoding paths.")
+    parser.add_argument('--songs', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    response = Response(payload(args.songs))
+    print("payload: {} songs, {:.1f} KB".format(args.songs, len(response.content)/1024))
+    for name, fn in (('legacy (unicode-escape + replace)', legacy), ('single pass (bytes + entities)', current)):
+        elapsed = timeit(fn, response, args.repeat)
+        print("{:<36} {:>9.2f} ms".format(name, elapsed*1000))
+    song = current(response)['songs'][0]
+    print("non-ASCII preserved:", song['copyright_text'] == "© 2013 T-Series – Café Niño")
+    print("legacy output:       ", legacy(response)['songs'][0]['copyright_text'])
+
+if __name__ == '__main__':
+    main()
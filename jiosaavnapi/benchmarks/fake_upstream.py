@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+ALBUM_SIZE = 20
+PLAYLIST_SIZE = 100
+SEARCH_SIZE = 5
+
+def recording_path(call, key):
+    name = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return os.path.join(RECORDINGS, call, name+'.json')
+
+def song(id):
+    n = int(hashlib.sha1(id.encode()).hexdigest()[:8], 16)
+    return {
+        "id": id,
+        "type": "",
+        "song": "Track {} &amp; Reprise &quot;Live&quot;".format(n % 997),
+        "album": "Album &#039;{}&#039;".format(n % 89),
+        "year": str(1990+n % 35),
+        "music": "Composer {}".format(n % 53),
+        "music_id": str(n % 53),
+        "primary_artists": "Artist {} &amp; Artist {}".format(n % 41, n % 43),
+        "primary_artists_id": str(n % 41),
+        "featured_artists": "",
+        "featured_artists_id": "",
+        "singers": "Singer {}".format(n % 31),
+        "starring": "",
+        "image": "https://c.saavncdn.com/{:03d}/cover-150x150.jpg".format(n % 1000),
+        "label": "Label {}".format(n % 17),
+        "albumid": str(10000+n % 89),
+        "language": "hindi",
+        "origin": "album",
+        "play_count": n % 100000,
+        "copyright_text": "&copy; {} Label {}".format(1990+n % 35, n % 17),
+        "320kbps": "true" if n % 2 else "false",
+        "is_dolby_content": False,
+        "explicit_content": 0,
+        "has_lyrics": "true" if n % 3 else "false",
+        "lyrics_snippet": "",
+        "encrypted_media_url": "ID2ieOjCrwfgWvL5sXl4B1ImC5QfbsDyfILjCzS/f02QPNKUa/7R1A==",
+        "encrypted_media_path": "",
+        "media_preview_url": "https://preview.saavncdn.com/{:03d}/{}_96_p.mp4".format(n % 1000, id),
+        "perma_url": "https://www.jiosaavn.com/song/track-{}/{}".format(n % 997, id),
+        "album_url": "https://www.jiosaavn.com/album/album-{}/{}".format(n % 89, 10000+n % 89),
+        "duration": str(120+n % 240),
+        "rights": {"code": 0, "reason": ""},
+        "webp": True,
+        "starred": "false",
+        "release_date": "2020-01-01",
+        "vcode": "",
+        "vlink": "",
+        "triller_available": False,
+        "label_url": "/label/label-{}".format(n % 17)
+    }
+
+def synthesize(call, query):
+    if call == 'autocomplete.get':
+        term = query.get('query', [''])[0]
+        prefix = hashlib.sha1(term.encode()).hexdigest()[:6]
+        return {"songs": {"data": [{"id": "s{}{}".format(prefix, i)} for i in range(SEARCH_SIZE)]}}
+    if call == 'song.getDetails':
+        return {id: song(id) for id in query.get('pids', [''])[0].split(',') if id}
+    if call == 'content.getAlbumDetails':
+        id = query.get('albumid', [''])[0]
+        return {
+            "title": "Album {} &amp; Friends".format(id),
+            "name": "Album {}".format(id),
+            "year": "2020",
+            "release_date": "2020-01-01",
+            "primary_artists": "Artist 1 &amp; Artist 2",
+            "albumid": id,
+            "perma_url": "https://www.jiosaavn.com/album/album/{}".format(id),
+            "image": "https://c.saavncdn.com/album/{}-150x150.jpg".format(id),
+            "songs": [song("a{}{:03d}".format(id, i)) for i in range(ALBUM_SIZE)]
+        }
+    if call == 'playlist.getDetails':
+        id = query.get('listid', [''])[0]
+        return {
+            "listid": id,
+            "listname": "Playlist {} &amp; More".format(id),
+            "firstname": "JioSaavn",
+            "follower_count": "1000",
+            "image": "https://c.saavncdn.com/playlist/{}-150x150.jpg".format(id),
+            "perma_url": "https://www.jiosaavn.com/featured/playlist/{}".format(id),
+            "songs": [song("p{}{:03d}".format(id, i)) for i in range(PLAYLIST_SIZE)]
+        }
+    if call == 'lyrics.getLyrics':
+        id = query.get('lyrics_id', [''])[0]
+        return {"lyrics": "Lyrics for {}<br>".format(id)*20, "lyrics_copyright": "", "snippet": ""}
+    if call == 'webapi.get':
+        token = query.get('token', [''])[0]
+        kind = query.get('type', ['song'])[0]
+        if kind == 'song':
+            return {"songs": [song(token)]}
+        if kind == 'album':
+            return {"albumid": token, "id": token}
+        return {"listid": token, "id": token}
+    return None
+
+def page(path):
+    token = path.rstrip('/').rsplit('/', 1)[-1]
+    filler = '<div>'+'x'*1024+'</div>'
+    if path.startswith('/song/'):
+        marker = '"song":{{"type":"","image":"","id":"{}","title":""'.format(token)
+    elif path.startswith('/album/'):
+        marker = '"album_id":"{}"'.format(token)
+    else:
+        marker = '"type":"playlist","id":"{}"'.format(token)
+    return (filler*100+marker+filler*200).encode()
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    jitter = 0.0
+
+    def do_GET(self):
+        delay = self.latency+random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        parts = urlsplit(self.path)
+        if parts.path == '/api.php':
+            query = parse_qs(parts.query)
+            call = query.get('__call', [''])[0]
+            body = self.replay(call, parts.query)
+            if body is None:
+                data = synthesize(call, query)
+                if data is None:
+                    return self.reply(404, b'{}')
+                body = json.dumps(data).encode()
+            return self.reply(200, body)
+        return self.reply(200, page(parts.path), 'text/html')
+
+    def replay(self, call, query):
+        path = recording_path(call, query)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read()
+        return None
+
+    def reply(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(host='127.0.0.1', port=0, latency=0.0, jitter=0.0):
+    handler = type('Handler', (Handler,), {"latency": latency, "jitter": jitter})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded or synthetic JioSaavn API responses.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random delay of up to this many seconds")
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.latency, args.jitter)
+    print("fake upstream on http://{}:{} (set JIOSAAVN_BASE_URL to this)".format(*server.server_address))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+if __name__ == '__main__':
+    main()
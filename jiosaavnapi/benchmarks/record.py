@@ -0,0 +1,46 @@
+import os
+import sys
+import argparse
+import requests
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'JioSaavnAPI'))
+
+import endpoints
+from fake_upstream import recording_path
+
+def record(url):
+    query = urlsplit(url).query
+    call = parse_qs(query)['__call'][0]
+    response = requests.get(url, timeout=15)
+    response.raise_for_status()
+    path = recording_path(call, query)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(response.content)
+    print("{:<24} {:>8} bytes  {}".format(call, len(response.content), path))
+
+def main():
+    parser = argparse.ArgumentParser(description="Record live jiosaavn.com responses for fake_upstream.py to replay.")
+    parser.add_argument('--search', nargs='*', default=[])
+    parser.add_argument('--song', nargs='*', default=[], help="song ids, one song.getDetails call each")
+    parser.add_argument('--songs', nargs='*', default=[], help="song ids fetched together in one pids= call")
+    parser.add_argument('--album', nargs='*', default=[])
+    parser.add_argument('--playlist', nargs='*', default=[])
+    parser.add_argument('--lyrics', nargs='*', default=[])
+    args = parser.parse_args()
+
+    if endpoints.base_url != endpoints.default_base_url:
+        parser.error("unset JIOSAAVN_BASE_URL to record from the live API")
+    urls = [endpoints.search_base_url+query for query in args.search]
+    urls += [endpoints.song_details_base_url+id for id in args.song]
+    if args.songs:
+        urls.append(endpoints.song_details_base_url+','.join(args.songs))
+    urls += [endpoints.album_details_base_url+id for id in args.album]
+    urls += [endpoints.playlist_details_base_url+id for id in args.playlist]
+    urls += [endpoints.lyrics_base_url+id for id in args.lyrics]
+    for url in urls:
+        record(url)
+
+if __name__ == '__main__':
+    main()
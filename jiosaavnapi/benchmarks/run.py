@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import fake_upstream
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(HERE, '..', 'JioSaavnAPI')
+RESULTS = os.path.join(HERE, 'results')
+
+ROUTES = {
+    "search": ('GET', "/song/?query=tum+hi+ho", None),
+    "song": ('GET', "/song/get/?id=s1a2b3c0", None),
+    "album": ('GET', "/album/?query=10001", None),
+    "playlist": ('GET', "/playlist/?query=110858205", None),
+    "lyrics": ('GET', "/lyrics/?query=s1a2b3c1", None),
+    "result": ('GET', "/result/?query=https://www.jiosaavn.com/song/tum-hi-ho/OQMaey5hbVc", None),
+    "batch": ('POST', "/songs/batch", ["s1a2b3c{}".format(i) for i in range(50)])
+}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_for(url, timeout=15):
+    deadline = time.monotonic()+timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("server at {} did not start".format(url))
+
+def spawn(server, upstream_url):
+    port = free_port()
+    env = dict(os.environ, JIOSAAVN_BASE_URL=upstream_url)
+    if server == 'asgi':
+        command = [sys.executable, '-m', 'hypercorn', '--bind', '127.0.0.1:{}'.format(port), 'asgi:app']
+    else:
+        command = [sys.executable, '-c', "import app; app.app.run(host='127.0.0.1', port={}, threaded=True)".format(port)]
+    process = subprocess.Popen(command, cwd=API_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    target = 'http://127.0.0.1:{}'.format(port)
+    wait_for(target+'/stats/')
+    return process, target
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(int(round(p/100*(len(values)-1))), len(values)-1)
+    return values[index]
+
+def drive(target, route, concurrency, requests_per_worker, nocache):
+    method, path, body = ROUTES[route]
+    if nocache:
+        path += ('&' if '?' in path else '?')+'nocache=true'
+    local = threading.local()
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        mine = []
+        failed = 0
+        for _ in range(requests_per_worker):
+            start = time.perf_counter()
+            try:
+                response = local.session.request(method, target+path, json=body, timeout=60)
+                if response.status_code != 200:
+                    failed += 1
+            except requests.RequestException:
+                failed += 1
+            mine.append(time.perf_counter()-start)
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter()-start
+    return {
+        "route": route,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput": len(latencies)/elapsed,
+        "p50_ms": percentile(latencies, 50)*1000,
+        "p95_ms": percentile(latencies, 95)*1000,
+        "p99_ms": percentile(latencies, 99)*1000
+    }
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(row['route'], row['concurrency']): row for row in json.load(f)['results']}
+    print("\ncompared with {}".format(baseline_path))
+    for row in results:
+        old = baseline.get((row['route'], row['concurrency']))
+        if not old:
+            continue
+        print("{:<9} c={:<4} throughput {:+7.1f}%  p99 {:+7.1f}%".format(
+            row['route'], row['concurrency'],
+            (row['throughput']/old['throughput']-1)*100,
+            (row['p99_ms']/old['p99_ms']-1)*100))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API routes against a local fake upstream.")
+    parser.add_argument('--server', choices=('flask', 'asgi'), default='asgi', help="which app to start")
+    parser.add_argument('--target', help="benchmark an already running server instead of starting one")
+    parser.add_argument('--routes', nargs='*', default=list(ROUTES), choices=list(ROUTES))
+    parser.add_argument('--concurrency', nargs='*', type=int, default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=50, help="requests per worker")
+    parser.add_argument('--latency', type=float, default=0.05, help="fake upstream latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--nocache', action='store_true', help="bypass the response cache on every request")
+    parser.add_argument('--compare', help="a saved results file to compare against")
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    upstream = fake_upstream.serve(latency=args.latency, jitter=args.jitter)
+    upstream_url = 'http://{}:{}'.format(*upstream.server_address)
+    process = None
+    target = args.target
+    if not target:
+        process, target = spawn(args.server, upstream_url)
+    try:
+        results = []
+        for concurrency in args.concurrency:
+            for route in args.routes:
+                row = drive(target, route, concurrency, args.requests, args.nocache)
+                results.append(row)
+                print("{route:<9} c={concurrency:<4} {throughput:>8.1f} req/s  p50 {p50_ms:>8.1f} ms  p95 {p95_ms:>8.1f} ms  p99 {p99_ms:>8.1f} ms  errors {errors}".format(**row))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+        upstream.shutdown()
+
+    if not args.no_save:
+        os.makedirs(RESULTS, exist_ok=True)
+        revision = git_revision()
+        path = os.path.join(RESULTS, "{}-{}-{}.json".format(time.strftime('%Y%m%d-%H%M%S'), revision, args.server))
+        with open(path, 'w') as f:
+            json.dump({
+                "revision": revision,
+                "server": args.target or args.server,
+                "latency": args.latency,
+                "jitter": args.jitter,
+                "nocache": args.nocache,
+                "results": results
+            }, f, indent=2)
+        print("\nsaved {}".format(path))
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
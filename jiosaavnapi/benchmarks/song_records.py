@@ -0,0 +1,103 @@
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'JioSaavnAPI'))
+
+import helper
+import records
+import fake_upstream
+
+def payload(count):
+    return json.dumps([fake_upstream.song("id{}".format(i)) for i in range(count)]).encode()
+
+def legacy_format(data):
+    # helper.format_song as it was before records: mutate the upstream dict in place and keep every key.
+    try:
+        url = data['media_preview_url']
+        url = url.replace("preview", "aac")
+        if data['320kbps']=="true":
+            url = url.replace("_96_p.mp4", "_320.mp4")
+        else:
+            url = url.replace("_96_p.mp4", "_160.mp4")
+        data['media_url'] = url
+    except KeyError or TypeError:
+        data['media_url'] = helper.decrypt_url(data['encrypted_media_url'])
+        if data['320kbps']!="true":
+            data['media_url'] = data['media_url'].replace("_320.mp4","_160.mp4")
+
+    data['song'] = helper.format(data['song'])
+    data['music'] = helper.format(data['music'])
+    data['singers'] = helper.format(data['singers'])
+    data['starring'] = helper.format(data['starring'])
+    data['album'] = helper.format(data['album'])
+    data["primary_artists"] = helper.format(data["primary_artists"])
+    data['image'] = data['image'].replace("150x150","500x500")
+
+    try:
+        data['copyright_text'] = helper.format(data['copyright_text'])
+    except KeyError:
+        pass
+    return data
+
+def record_format(raw):
+    return helper.format_song(raw, False)
+
+def legacy_dumps(songs):
+    return json.dumps(songs, sort_keys=True, separators=(',', ':')).encode()
+
+def stdlib_dumps(songs):
+    orjson, records.orjson = records.orjson, None
+    try:
+        return records.dumps(songs)
+    finally:
+        records.orjson = orjson
+
+def retained(fn, body):
+    gc.collect()
+    tracemalloc.start()
+    songs = [fn(raw) for raw in json.loads(body)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return songs, size
+
+def timeit(fn, value, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(value)
+        elapsed = time.perf_counter()-start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the dict and record song paths.")
+    parser.add_argument('--songs', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    body = payload(args.songs)
+    print("payload: {} songs, {:.1f} KB".format(args.songs, len(body)/1024))
+    dicts, dict_bytes = retained(legacy_format, body)
+    songs, record_bytes = retained(record_format, body)
+    print("retained memory  dicts {:>8.1f} KB  records {:>8.1f} KB  ({:.0f}%)".format(dict_bytes/1024, record_bytes/1024, record_bytes/dict_bytes*100))
+    print("format           dicts {:>8.2f} ms  records {:>8.2f} ms".format(
+        timeit(lambda body: [legacy_format(raw) for raw in json.loads(body)], body, args.repeat)*1000,
+        timeit(lambda body: [record_format(raw) for raw in json.loads(body)], body, args.repeat)*1000))
+    print("serialize        json.dumps(dicts) {:>8.2f} ms  {:.1f} KB".format(timeit(legacy_dumps, dicts, args.repeat)*1000, len(legacy_dumps(dicts))/1024))
+    # Same keys as the records, so this is the floor the stdlib fallback is measured against.
+    trimmed = [song.to_dict() for song in songs]
+    print("                 as plain dicts    {:>8.2f} ms  {:.1f} KB".format(timeit(legacy_dumps, trimmed, args.repeat)*1000, len(legacy_dumps(trimmed))/1024))
+    print("                 records, stdlib   {:>8.2f} ms  {:.1f} KB".format(timeit(stdlib_dumps, songs, args.repeat)*1000, len(stdlib_dumps(songs))/1024))
+    if records.orjson is not None:
+        print("                 records, orjson   {:>8.2f} ms  {:.1f} KB".format(timeit(records.dumps, songs, args.repeat)*1000, len(records.dumps(songs))/1024))
+    else:
+        print("                 records, orjson   not installed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+import importlib.util
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _load(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+fake_upstream = _load('fake_upstream', os.path.join(ROOT, 'benchmarks', 'fake_upstream.py'))
+server = fake_upstream.serve()
+os.environ['JIOSAAVN_BASE_URL'] = 'http://{}:{}'.format(*server.server_address)
+os.environ['STORE_PATH'] = ''
+os.environ['PREFETCH'] = 'false'
+sys.path.insert(0, os.path.join(ROOT, 'JioSaavnAPI'))
+
+import cache
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+    yield
+    cache.clear()
@@ -0,0 +1,92 @@
+import json
+import time
+import app
+import endpoints
+import helper
+import jiosaavn
+import policy
+import upstream
+
+client = app.app.test_client()
+
+def test_song_get():
+    response = client.get('/song/get/?id=abc&fields=id,song,media_url')
+    assert response.status_code == 200
+    song = response.get_json()
+    assert song['id'] == 'abc'
+    assert set(song) == {'id', 'song', 'media_url'}
+
+def test_song_get_requires_id():
+    assert client.get('/song/get/').get_json() == {"status": False, "error": 'Song ID is required to get a song!'}
+
+def test_search():
+    songs = client.get('/song/?query=love&limit=2').get_json()
+    assert len(songs) == 2
+    assert all('media_url' in song for song in songs)
+
+def test_album_page():
+    album = client.get('/album/?query=555&offset=2&limit=3').get_json()
+    assert album['albumid'] == '555'
+    assert len(album['songs']) == 3
+
+def test_album_ndjson():
+    response = client.get('/album/?query=555&stream=ndjson&limit=2')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert lines[0]['albumid'] == '555'
+    assert len(lines) == 3
+
+def test_batch():
+    results = client.post('/songs/batch', json=['abc', ' def ']).get_json()['results']
+    assert [result['data']['id'] for result in results] == ['abc', 'def']
+
+def test_compressed_and_tagged():
+    response = client.get('/album/?query=555', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    etag = response.headers['ETag']
+    assert client.get('/album/?query=555', headers={'If-None-Match': etag}).status_code == 304
+
+def test_upstream_failure_is_not_an_invalid_id(monkeypatch):
+    def unavailable(url, **kwargs):
+        raise policy.Unavailable('song upstream circuit is open')
+    monkeypatch.setattr(upstream, 'get', unavailable)
+    response = client.get('/song/get/?id=abc')
+    assert response.status_code == 503
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert response.get_json()['status'] is False
+    assert response.get_json()['error'] != 'Invalid Song ID received!'
+
+def test_upstream_failure_is_not_a_missing_song(monkeypatch):
+    get = upstream.get
+
+    def song_circuit_open(url, **kwargs):
+        if url.startswith(endpoints.song_details_base_url):
+            raise policy.Unavailable('song upstream circuit is open')
+        return get(url, **kwargs)
+    monkeypatch.setattr(upstream, 'get', song_circuit_open)
+    for response in (client.post('/songs/batch', json=['abc']), client.get('/song/?query=newquery')):
+        assert response.status_code == 503
+        assert response.headers['Cache-Control'] == 'no-store'
+        assert response.get_json()['error'] == app.routes.UNAVAILABLE
+
+def test_result_errors_are_not_cached_as_results(monkeypatch):
+    def missing(url):
+        raise ValueError('Could not find the album id in {}'.format(url))
+    monkeypatch.setattr(jiosaavn, 'get_album_id', missing)
+    response = client.get('/result/?query=https://www.jiosaavn.com/album/x/y')
+    body = response.get_json()
+    assert body['status'] is False
+    assert response.headers['Cache-Control'] == 'public, max-age=30'
+
+def test_partial_responses_are_not_stored(monkeypatch):
+    get = upstream.get
+
+    def slow_lyrics(url, **kwargs):
+        if url.startswith(endpoints.lyrics_base_url):
+            time.sleep(0.5)
+        return get(url, **kwargs)
+    monkeypatch.setattr(upstream, 'get', slow_lyrics)
+    monkeypatch.setattr(helper, 'LYRICS_DEADLINE', 0.05)
+    response = client.get('/song/get/?id=def&lyrics=true&fields=id,lyrics')
+    assert response.get_json() == {'id': 'def', 'lyrics': None, 'lyrics_timeout': True}
+    assert response.headers['Cache-Control'] == 'no-store'
@@ -0,0 +1,100 @@
+import json
+import asyncio
+import asgi
+import helper
+import endpoints
+import policy
+
+client = asgi.app.test_client()
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+async def fetch(path, **kwargs):
+    response = await client.get(path, **kwargs)
+    return response, await response.get_data()
+
+def get_json(path):
+    response, body = run(fetch(path))
+    assert response.status_code == 200
+    return json.loads(body)
+
+def test_song_get():
+    song = get_json('/song/get/?id=abc&fields=id,song,media_url')
+    assert song['id'] == 'abc'
+    assert set(song) == {'id', 'song', 'media_url'}
+
+def test_song_get_requires_id():
+    assert get_json('/song/get/') == {"status": False, "error": 'Song ID is required to get a song!'}
+
+def test_search():
+    songs = get_json('/song/?query=love&limit=2')
+    assert len(songs) == 2
+    assert all('media_url' in song for song in songs)
+
+def test_album_page():
+    album = get_json('/album/?query=555&offset=2&limit=3')
+    assert album['albumid'] == '555'
+    assert len(album['songs']) == 3
+
+def test_album_ndjson():
+    response, body = run(fetch('/album/?query=555&stream=ndjson&limit=2'))
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert lines[0]['albumid'] == '555'
+    assert len(lines) == 3
+
+def test_batch():
+    async def post():
+        response = await client.post('/songs/batch', json=['abc', ' def '])
+        return json.loads(await response.get_data())
+    results = run(post())['results']
+    assert [result['data']['id'] for result in results] == ['abc', 'def']
+
+def test_compressed_and_tagged():
+    response, _ = run(fetch('/album/?query=555', headers={'Accept-Encoding': 'gzip'}))
+    assert response.headers['Content-Encoding'] == 'gzip'
+    etag = response.headers['ETag']
+    response, _ = run(fetch('/album/?query=555', headers={'If-None-Match': etag}))
+    assert response.status_code == 304
+
+def test_upstream_failure_is_not_an_invalid_id(monkeypatch):
+    async def unavailable(url, stream=False):
+        raise policy.Unavailable('song upstream circuit is open')
+    monkeypatch.setattr(asgi.jiosaavn, 'get', unavailable)
+    response, body = run(fetch('/song/get/?id=abc'))
+    assert response.status_code == 503
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert json.loads(body)['status'] is False
+    assert json.loads(body)['error'] != 'Invalid Song ID received!'
+
+def test_upstream_failure_is_not_a_missing_song(monkeypatch):
+    get = asgi.jiosaavn.get
+
+    async def song_circuit_open(url, stream=False):
+        if url.startswith(endpoints.song_details_base_url):
+            raise policy.Unavailable('song upstream circuit is open')
+        return await get(url, stream)
+    monkeypatch.setattr(asgi.jiosaavn, 'get', song_circuit_open)
+
+    async def requests():
+        batch = await client.post('/songs/batch', json=['abc'])
+        search = await client.get('/song/?query=newquery')
+        return [(batch, await batch.get_data()), (search, await search.get_data())]
+    for response, body in run(requests()):
+        assert response.status_code == 503
+        assert response.headers['Cache-Control'] == 'no-store'
+        assert json.loads(body)['error'] == asgi.routes.UNAVAILABLE
+
+def test_partial_responses_are_not_stored(monkeypatch):
+    get = asgi.jiosaavn.get
+
+    async def slow_lyrics(url, stream=False):
+        if url.startswith(endpoints.lyrics_base_url):
+            await asyncio.sleep(0.5)
+        return await get(url, stream)
+    monkeypatch.setattr(asgi.jiosaavn, 'get', slow_lyrics)
+    monkeypatch.setattr(helper, 'LYRICS_DEADLINE', 0.05)
+    response, body = run(fetch('/song/get/?id=ghi&lyrics=true&fields=id,lyrics'))
+    assert json.loads(body) == {'id': 'ghi', 'lyrics': None, 'lyrics_timeout': True}
+    assert response.headers['Cache-Control'] == 'no-store'
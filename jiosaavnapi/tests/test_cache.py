@@ -0,0 +1,68 @@
+import time
+import pytest
+import cache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', clock)
+    return clock
+
+def test_entries_go_stale_then_expire(clock):
+    key = cache.entry_key('song', 'abc', False)
+    cache.store(key, {'id': 'abc'})
+    assert cache.lookup(key) == ({'id': 'abc'}, True)
+    clock.now += cache.TTL
+    assert cache.lookup(key) == ({'id': 'abc'}, False)
+    assert cache.fresh_value(key) is None
+    clock.now += cache.STALE_TTL
+    assert cache.lookup(key) == (None, False)
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    monkeypatch.setattr(cache, 'MAX_ENTRIES', 2)
+    for id in ('a', 'b'):
+        cache.store(cache.entry_key('song', id, False), id)
+    cache.lookup(cache.entry_key('song', 'a', False))
+    cache.store(cache.entry_key('song', 'c', False), 'c')
+    assert cache.in_memory(cache.entry_key('song', 'a', False))
+    assert not cache.in_memory(cache.entry_key('song', 'b', False))
+    assert cache.in_memory(cache.entry_key('song', 'c', False))
+
+def test_stale_entries_are_served_while_revalidating(clock):
+    key = cache.entry_key('song', 'abc', False)
+    cache.store(key, 'old')
+    clock.now += cache.TTL
+    assert cache.get_or_load('song', 'abc', False, lambda: 'new') == 'old'
+    deadline = time.time()+5
+    while cache.lookup(key)[0] != 'new' and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.lookup(key) == ('new', True)
+
+def test_bypass_skips_cached_entries():
+    cache.store(cache.entry_key('song', 'abc', False), 'old')
+    cache.set_bypass(True)
+    try:
+        assert cache.get_or_load('song', 'abc', False, lambda: 'new') == 'new'
+    finally:
+        cache.set_bypass(False)
+    assert cache.get_or_load('song', 'abc', False, lambda: 'newer') == 'new'
+
+def test_failed_loads_fall_back_to_stale_entries(clock):
+    def unavailable():
+        raise ConnectionError('upstream is down')
+    cache.store(cache.entry_key('song', 'abc', False), 'old')
+    clock.now += cache.TTL+cache.STALE_TTL
+    assert cache.get_or_load('song', 'abc', False, unavailable) == 'old'
+    with pytest.raises(ConnectionError):
+        cache.get_or_load('song', 'def', False, unavailable)
+
+def test_incomplete_values_are_returned_but_not_kept():
+    assert cache.get_or_load('song', 'abc', False, lambda: 'partial', lambda value: False) == 'partial'
+    assert not cache.in_memory(cache.entry_key('song', 'abc', False))
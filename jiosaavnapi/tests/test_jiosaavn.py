@@ -0,0 +1,73 @@
+import time
+import asyncio
+import threading
+import cache
+import endpoints
+import helper
+import jiosaavn
+import jiosaavn_async
+import upstream
+
+def test_projected_and_full_song_lookups_do_not_share_a_flight(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    fetch = jiosaavn._fetch_song
+
+    def slow(id, lyrics, media_url=True):
+        started.set()
+        release.wait(5)
+        return fetch(id, lyrics, media_url)
+    monkeypatch.setattr(jiosaavn, '_fetch_song', slow)
+    results = {}
+    projected = threading.Thread(target=lambda: results.setdefault('projected', jiosaavn.get_song('abc', False, ['id', 'song'])))
+    full = threading.Thread(target=lambda: results.setdefault('full', jiosaavn.get_song('abc', False)))
+    projected.start()
+    started.wait(5)
+    full.start()
+    time.sleep(0.1)
+    release.set()
+    projected.join(5)
+    full.join(5)
+    assert set(results['projected']) == {'id', 'song'}
+    assert 'media_url' in results['full']
+
+def test_projected_and_full_song_lookups_do_not_share_a_flight_async():
+    async def lookups():
+        return await asyncio.gather(jiosaavn_async.get_song('abc', False, ['id', 'song']), jiosaavn_async.get_song('abc', False))
+    projected, full = asyncio.get_event_loop().run_until_complete(lookups())
+    assert set(projected) == {'id', 'song'}
+    assert 'media_url' in full
+
+def test_slow_lyrics_return_a_partial_song_that_is_not_cached(monkeypatch):
+    get = upstream.get
+
+    def slow_lyrics(url, **kwargs):
+        if url.startswith(endpoints.lyrics_base_url):
+            time.sleep(0.5)
+        return get(url, **kwargs)
+    monkeypatch.setattr(upstream, 'get', slow_lyrics)
+    monkeypatch.setattr(helper, 'LYRICS_DEADLINE', 0.05)
+    started = time.monotonic()
+    song = jiosaavn.get_song('late', True)
+    assert time.monotonic()-started < 0.4
+    assert 'media_url' in song
+    assert song['lyrics'] is None
+    assert song['lyrics_timeout'] is True
+    assert not cache.in_memory(cache.entry_key('song', 'late', True))
+
+def test_slow_lyrics_return_a_partial_song_that_is_not_cached_async(monkeypatch):
+    get = jiosaavn_async.get
+
+    async def slow_lyrics(url, stream=False):
+        if url.startswith(endpoints.lyrics_base_url):
+            await asyncio.sleep(0.5)
+        return await get(url, stream)
+    monkeypatch.setattr(jiosaavn_async, 'get', slow_lyrics)
+    monkeypatch.setattr(helper, 'LYRICS_DEADLINE', 0.05)
+    started = time.monotonic()
+    song = asyncio.get_event_loop().run_until_complete(jiosaavn_async.get_song('slow', True))
+    assert time.monotonic()-started < 0.4
+    assert 'media_url' in song
+    assert song['lyrics'] is None
+    assert song['lyrics_timeout'] is True
+    assert not cache.in_memory(cache.entry_key('song', 'slow', True))
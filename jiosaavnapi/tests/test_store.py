@@ -0,0 +1,76 @@
+import time
+import queue
+import pytest
+import store
+
+@pytest.fixture(scope='module')
+def disk(tmp_path_factory):
+    store.PATH = str(tmp_path_factory.mktemp('store')/'records.db')
+    store._setup()
+    assert store.enabled()
+    yield store
+    store._ready = False
+    store.PATH = ''
+    while True:
+        try:
+            store._pool.get_nowait().close()
+        except queue.Empty:
+            break
+
+def flushed(key):
+    deadline = time.time()+5
+    while store.age(key) is None and time.time() < deadline:
+        time.sleep(0.01)
+    return store.age(key) is not None
+
+def test_records_round_trip(disk):
+    key = ('lyrics', 'abc', False)
+    store.put(key, 'Lyrics for abc')
+    assert flushed(key)
+    value, age = store.get(key)
+    assert value == 'Lyrics for abc'
+    assert 0 <= age < 5
+    assert store.get(('lyrics', 'missing', False)) == (None, None)
+
+def test_writes_to_the_same_key_are_coalesced(disk):
+    key = ('lyrics', 'def', False)
+    with store._written:
+        store.put(key, 'first')
+        store.put(key, 'second')
+        assert len(store._writes) == 1
+    assert flushed(key)
+    assert store.get(key)[0] == 'second'
+
+def test_writes_are_dropped_when_the_queue_is_full(disk, monkeypatch):
+    monkeypatch.setattr(store, 'WRITE_QUEUE_SIZE', 0)
+    dropped = store.stats()['dropped_writes']
+    store.put(('lyrics', 'ghi', False), 'dropped')
+    assert store.stats()['dropped_writes'] == dropped+1
+
+def test_ids_round_trip(disk):
+    store.put_id('album', 'www.jiosaavn.com/album/x/y', '555')
+    deadline = time.time()+5
+    while store.get_id('album', 'www.jiosaavn.com/album/x/y') is None and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.get_id('album', 'www.jiosaavn.com/album/x/y') == '555'
+
+def test_compaction_expires_old_records(disk):
+    key = ('lyrics', 'jkl', False)
+    store.put(key, 'old')
+    assert flushed(key)
+    time.sleep(0.05)
+    store.compact(max_age=0.01)
+    assert store.get(key) == (None, None)
+
+def test_compaction_evicts_least_recently_used_records(disk, monkeypatch):
+    store.compact(max_age=0)
+    evicted, kept = ('lyrics', 'evicted', False), ('lyrics', 'kept', False)
+    store.put(evicted, 'x'*100)
+    assert flushed(evicted)
+    time.sleep(0.01)
+    store.put(kept, 'x'*100)
+    assert flushed(kept)
+    monkeypatch.setattr(store, 'MAX_BYTES', 150)
+    store.compact(max_age=None)
+    assert store.age(evicted) is None
+    assert store.get(kept)[0] == 'x'*100
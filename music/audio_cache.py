@@ -0,0 +1,126 @@
+import os
+import re
+import shutil
+import asyncio
+import logging
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+
+CACHE_DIR = os.environ.get("AUDIO_CACHE_DIR", "/musicfiles")
+MAX_BYTES = int(os.environ.get("AUDIO_CACHE_MAX_BYTES", 2*1024**3))
+JOB_PREFIX = "job-"
+
+_entries = OrderedDict()
+_pins = {}
+_inflight = {}
+_listeners = {}
+_size = 0
+_prepared = False
+
+def _prepare():
+    global _prepared
+    if _prepared:
+        return
+    _prepared = True
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    found = []
+    for entry in os.scandir(CACHE_DIR):
+        if entry.is_dir() and entry.name.startswith(JOB_PREFIX):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        elif entry.is_file():
+            stat = entry.stat()
+            found.append((stat.st_mtime, entry.name, stat.st_size))
+    for _, name, size in sorted(found):
+        _add(name, size)
+
+def key(song_id, audio_format, quality):
+    return "{}-{}.{}".format(re.sub(r'[^A-Za-z0-9_]+', '_', str(song_id)), re.sub(r'[^A-Za-z0-9]+', '', str(quality)), audio_format)
+
+def _add(name, size):
+    global _size
+    _size -= _entries.pop(name, 0)
+    _entries[name] = size
+    _size += size
+    _evict()
+
+def _drop(name):
+    global _size
+    _size -= _entries.pop(name, 0)
+    try:
+        os.remove(os.path.join(CACHE_DIR, name))
+    except FileNotFoundError:
+        pass
+
+def _evict():
+    while _size > MAX_BYTES:
+        victim = next((name for name in _entries if not _pins.get(name)), None)
+        if victim is None:
+            return
+        _drop(victim)
+
+@contextmanager
+def pinned(name):
+    _prepare()
+    _pins[name] = _pins.get(name, 0)+1
+    try:
+        yield
+    finally:
+        _pins[name] -= 1
+        if not _pins[name]:
+            del _pins[name]
+            _evict()
+
+def get(name):
+    _prepare()
+    if name not in _entries:
+        return None
+    path = os.path.join(CACHE_DIR, name)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        _drop(name)
+        return None
+    _entries.move_to_end(name)
+    return path
+
+def pending(name):
+    return name in _inflight
+
+async def _fill(name, create):
+    directory = tempfile.mkdtemp(prefix=JOB_PREFIX, dir=CACHE_DIR)
+    try:
+        source = await create(directory)
+        path = os.path.join(CACHE_DIR, name)
+        os.replace(source, path)
+        _add(name, os.path.getsize(path))
+        return path
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def _finished(name, task):
+    _inflight.pop(name, None)
+    if not task.cancelled() and task.exception() is not None:
+        logging.warning("Could not cache %s: %s", name, task.exception())
+
+async def _broadcast(name, message):
+    for progress in list(_listeners.get(name, ())):
+        try:
+            await progress(message)
+        except Exception as e:
+            logging.warning("Could not report progress for %s: %s", name, e)
+
+async def fill(name, create, progress):
+    _prepare()
+    listeners = _listeners.setdefault(name, [])
+    listeners.append(progress)
+    try:
+        task = _inflight.get(name)
+        if task is None:
+            task = _inflight[name] = asyncio.ensure_future(_fill(name, lambda directory: create(directory, lambda message: _broadcast(name, message))))
+            task.add_done_callback(lambda task: _finished(name, task))
+        return await asyncio.shield(task)
+    finally:
+        listeners.remove(progress)
+        if not listeners and _listeners.get(name) is listeners:
+            del _listeners[name]
@@ -0,0 +1,141 @@
+import os
+import re
+import time
+import hashlib
+import asyncio
+import logging
+import requests
+import audio_cache
+from contextlib import asynccontextmanager
+
+API_URL = os.environ.get("JIOSAAVN_API_URL", "http://jiosaavnapi:5000")
+AUDIO_FORMAT = os.environ.get("DOWNLOAD_FORMAT", "mp3")
+AUDIO_QUALITY = os.environ.get("DOWNLOAD_QUALITY", "192K")
+MAX_JOBS = int(os.environ.get("DOWNLOAD_MAX_JOBS", 2))
+GUILD_QUEUE_SIZE = int(os.environ.get("DOWNLOAD_GUILD_QUEUE_SIZE", 3))
+FETCH_TIMEOUT = float(os.environ.get("DOWNLOAD_FETCH_TIMEOUT", 15))
+TRANSCODE_TIMEOUT = float(os.environ.get("DOWNLOAD_TRANSCODE_TIMEOUT", 300))
+PROGRESS_INTERVAL = float(os.environ.get("DOWNLOAD_PROGRESS_INTERVAL", 2))
+
+PROGRESS_REGEX = re.compile(r"^\[download\]\s+([0-9.]+)%")
+
+_session = requests.Session()
+_slots = None
+_guilds = {}
+_prepared = False
+
+class DownloadError(Exception):
+    pass
+
+class GuildQueue:
+    __slots__ = ('lock', 'pending')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+def _prepare():
+    global _prepared, _slots
+    if _prepared:
+        return
+    _prepared = True
+    _slots = asyncio.Semaphore(MAX_JOBS)
+
+def _search(query):
+    response = _session.get(f"{API_URL}/result/", params={"query": query}, timeout=FETCH_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+async def lookup(query):
+    loop = asyncio.get_running_loop()
+    try:
+        results = await loop.run_in_executor(None, _search, query)
+    except (requests.RequestException, ValueError) as e:
+        logging.warning("Download lookup failed for %r: %s", query, e)
+        raise DownloadError("Could not reach the song search service.") from None
+    if not isinstance(results, list) or not results or not results[0].get('media_url'):
+        raise DownloadError("No results found.")
+    return results[0]
+
+async def _report(progress, state, message):
+    now = time.monotonic()
+    if now-state[0] < PROGRESS_INTERVAL:
+        return
+    state[0] = now
+    try:
+        await progress(message)
+    except Exception as e:
+        logging.warning("Could not report download progress: %s", e)
+
+async def _drain(process, progress):
+    state = [0.0]
+    while True:
+        line = await process.stdout.readline()
+        if not line:
+            break
+        line = line.decode(errors='replace').strip()
+        match = PROGRESS_REGEX.match(line)
+        if match:
+            await _report(progress, state, f"Downloading... {float(match.group(1)):.0f}%")
+        elif line.startswith("[ffmpeg]"):
+            state[0] = 0.0
+            await _report(progress, state, "Converting...")
+    return await process.wait()
+
+async def transcode(url, directory, progress):
+    process = await asyncio.create_subprocess_exec(
+        "youtube-dl", "--newline", "--no-playlist", "-x", "--audio-format", AUDIO_FORMAT, "--audio-quality", AUDIO_QUALITY,
+        "-o", os.path.join(directory, "audio.%(ext)s"), url,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+    try:
+        code = await asyncio.wait_for(_drain(process, progress), TRANSCODE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise DownloadError("The download took too long.") from None
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    path = os.path.join(directory, f"audio.{AUDIO_FORMAT}")
+    if code != 0 or not os.path.exists(path):
+        logging.warning("youtube-dl exited with %s for %s", code, url)
+        raise DownloadError("The song could not be converted.")
+    return path
+
+async def _transcode(song, directory, progress):
+    if _slots.locked():
+        await progress("Waiting for a free download slot...")
+    async with _slots:
+        await progress(f"Downloading **{song['song']}**...")
+        return await transcode(song['media_url'], directory, progress)
+
+@asynccontextmanager
+async def job(guild_id, query, progress):
+    _prepare()
+    guild = _guilds.get(guild_id)
+    if guild is None:
+        guild = _guilds[guild_id] = GuildQueue()
+    if guild.pending >= GUILD_QUEUE_SIZE:
+        raise DownloadError("This server already has too many downloads queued.")
+    guild.pending += 1
+    try:
+        if guild.lock.locked():
+            await progress(f"Queued behind {guild.pending-1} download(s) in this server.")
+        async with guild.lock:
+            await progress("Searching...")
+            song = await lookup(query)
+            name = audio_cache.key(song.get('id') or hashlib.sha1(song['media_url'].encode()).hexdigest(), AUDIO_FORMAT, AUDIO_QUALITY)
+            with audio_cache.pinned(name):
+                path = audio_cache.get(name)
+                if path is None:
+                    if audio_cache.pending(name):
+                        await progress(f"Waiting for another download of **{song['song']}**...")
+                    path = await audio_cache.fill(name, lambda directory, report: _transcode(song, directory, report), progress)
+                yield song, path
+    finally:
+        guild.pending -= 1
+        if not guild.pending:
+            _guilds.pop(guild_id, None)
+
+def filename(song):
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]+', ' ', song.get('song') or 'song').strip() or 'song'
+    return f"{name}.{AUDIO_FORMAT}"
@@ -0,0 +1,129 @@
+import os
+import time
+import asyncio
+import logging
+import lavasnek_rs
+import spotify
+import track_meta
+
+CONCURRENCY = int(os.environ.get("IMPORT_CONCURRENCY", 8))
+PAGE_CONCURRENCY = int(os.environ.get("IMPORT_PAGE_CONCURRENCY", 4))
+PROGRESS_INTERVAL = float(os.environ.get("IMPORT_PROGRESS_INTERVAL", 2))
+PLAYLIST_PAGE = 100
+ALBUM_PAGE = 50
+
+_imports = {}
+
+class Entry:
+    __slots__ = ('title', 'artist', 'duration', 'meta', 'track', 'requester')
+
+    def __init__(self, title, artist, duration, meta, track=None, requester=None):
+        self.title = title
+        self.artist = artist
+        self.duration = duration
+        self.meta = meta
+        self.track = track
+        self.requester = requester
+
+def _entry(track, album=None):
+    if not track or not track.get('name'):
+        return None
+    artists = track.get('artists') or [{}]
+    return Entry(track['name'], artists[0].get('name') or '', track.get('duration_ms') or 0, track_meta.from_spotify(track, album))
+
+async def _pages(method, id, first, limit, **kwargs):
+    limiter = asyncio.Semaphore(PAGE_CONCURRENCY)
+
+    async def page(offset):
+        async with limiter:
+            return await spotify.call(method, id, limit=limit, offset=offset, **kwargs)
+
+    offsets = range(len(first['items']), first.get('total') or 0, limit)
+    items = list(first['items'])
+    for offset, result in zip(offsets, await asyncio.gather(*(page(offset) for offset in offsets))):
+        if result:
+            items.extend(result['items'])
+        else:
+            logging.warning("Skipped Spotify %s page at offset %s for %s", method, offset, id)
+    return items
+
+async def playlist(playlist_id):
+    first = await spotify.call("playlist_items", playlist_id, limit=PLAYLIST_PAGE, additional_types=("track",))
+    if not first:
+        return None
+    items = await _pages("playlist_items", playlist_id, first, PLAYLIST_PAGE, additional_types=("track",))
+    return [entry for entry in (_entry(item.get('track')) for item in items) if entry]
+
+async def album(album_id):
+    album = await spotify.call("album", album_id)
+    if not album:
+        return None
+    items = await _pages("album_tracks", album_id, album['tracks'], ALBUM_PAGE)
+    return [entry for entry in (_entry(track, album) for track in items) if entry]
+
+async def resolve(lavalink, entry):
+    if entry.track is not None:
+        return entry.track
+    try:
+        result = await lavalink.get_tracks(f"ytmsearch:{entry.title} {entry.artist}")
+    except Exception as e:
+        logging.warning("Could not resolve %s - %s: %s", entry.title, entry.artist, e)
+        return None
+    return result.tracks[0] if result.tracks else None
+
+async def _report(progress, state, queued, failed, total):
+    now = time.monotonic()
+    if now-state[0] < PROGRESS_INTERVAL:
+        return
+    state[0] = now
+    try:
+        await progress(queued, failed, total)
+    except Exception as e:
+        logging.warning("Could not report import progress: %s", e)
+
+async def enqueue(lavalink, guild_id, requester, entries, progress):
+    limiter = asyncio.Semaphore(CONCURRENCY)
+
+    async def limited(entry):
+        async with limiter:
+            return await resolve(lavalink, entry)
+
+    tasks = [asyncio.ensure_future(limited(entry)) for entry in entries]
+    state = [time.monotonic()]
+    queued = failed = 0
+    try:
+        for entry, task in zip(entries, tasks):
+            track = await task
+            if track is None:
+                failed += 1
+                continue
+            track_meta.remember(guild_id, track, entry.meta)
+            try:
+                await lavalink.play(guild_id, track).requester(requester).queue()
+            except lavasnek_rs.NoSessionPresent:
+                break
+            queued += 1
+            await _report(progress, state, queued, failed, len(entries))
+    finally:
+        for task in tasks:
+            task.cancel()
+    return queued, failed
+
+def start(guild_id, coro):
+    task = asyncio.ensure_future(coro)
+    _imports.setdefault(guild_id, set()).add(task)
+    task.add_done_callback(lambda task: _finished(guild_id, task))
+    return task
+
+def _finished(guild_id, task):
+    tasks = _imports.get(guild_id)
+    if tasks is not None:
+        tasks.discard(task)
+        if not tasks:
+            del _imports[guild_id]
+    if not task.cancelled() and task.exception() is not None:
+        logging.error("Import failed on guild %s", guild_id, exc_info=task.exception())
+
+def cancel(guild_id):
+    for task in _imports.pop(guild_id, ()):
+        task.cancel()
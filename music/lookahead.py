@@ -0,0 +1,128 @@
+import os
+import asyncio
+import logging
+import lavasnek_rs
+import importer
+import track_meta
+
+THRESHOLD = int(os.environ.get("LAZY_QUEUE_THRESHOLD", 100))
+LOOKAHEAD = int(os.environ.get("QUEUE_LOOKAHEAD", 3))
+
+_pending = {}
+_locks = {}
+_tasks = set()
+
+def active(guild_id):
+    return bool(_pending.get(guild_id))
+
+def entries(guild_id):
+    return _pending.get(guild_id, [])
+
+def extend(guild_id, new_entries, requester):
+    for entry in new_entries:
+        if entry.requester is None:
+            entry.requester = requester
+    _pending.setdefault(guild_id, []).extend(new_entries)
+
+def forget(guild_id):
+    _pending.pop(guild_id, None)
+    _locks.pop(guild_id, None)
+
+def from_queued(guild_id, queued):
+    info = queued.track.info
+    return importer.Entry(info.title, info.author, info.length, track_meta.get(guild_id, queued.track), track=queued.track, requester=queued.requester)
+
+async def _queue(lavalink, guild_id, entry, track):
+    track_meta.remember(guild_id, track, entry.meta)
+    await lavalink.play(guild_id, track).requester(entry.requester).queue()
+
+def _lock(guild_id):
+    lock = _locks.get(guild_id)
+    if lock is None:
+        lock = _locks[guild_id] = asyncio.Lock()
+    return lock
+
+async def top_up(lavalink, guild_id):
+    async with _lock(guild_id):
+        while _pending.get(guild_id):
+            pending = _pending[guild_id]
+            node = await lavalink.get_guild_node(guild_id)
+            needed = LOOKAHEAD+1-(len(node.queue) if node else 0)
+            if needed <= 0:
+                return
+            batch = pending[:needed]
+            tracks = await asyncio.gather(*(importer.resolve(lavalink, entry) for entry in batch))
+            for entry, track in zip(batch, tracks):
+                if not any(candidate is entry for candidate in pending):
+                    continue
+                pending.remove(entry)
+                if track is None:
+                    continue
+                try:
+                    await _queue(lavalink, guild_id, entry, track)
+                except lavasnek_rs.NoSessionPresent:
+                    forget(guild_id)
+                    return
+        _pending.pop(guild_id, None)
+
+def schedule(lavalink, guild_id):
+    if not active(guild_id):
+        return
+    task = asyncio.ensure_future(top_up(lavalink, guild_id))
+    _tasks.add(task)
+    task.add_done_callback(_finished)
+
+def _finished(task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.error("Queue look-ahead failed", exc_info=task.exception())
+
+async def remove(lavalink, guild_id, index):
+    async with _lock(guild_id):
+        node = await lavalink.get_guild_node(guild_id)
+        if not node:
+            return None
+        queue = node.queue
+        if 0 < index < len(queue):
+            entry = from_queued(guild_id, queue.pop(index))
+            node.queue = queue
+            await lavalink.set_guild_node(guild_id, node)
+            track_meta.prune(guild_id, queue)
+            return entry
+        pending = _pending.get(guild_id)
+        index -= len(queue)
+        if not pending or not 0 <= index < len(pending):
+            return None
+        return pending.pop(index)
+
+async def move(lavalink, guild_id, old_index, new_index):
+    async with _lock(guild_id):
+        pending = _pending.setdefault(guild_id, [])
+        node = await lavalink.get_guild_node(guild_id)
+        if not node:
+            return None
+        queue = node.queue
+        total = len(queue)+len(pending)
+        if not 0 < old_index < total or not 0 < new_index < total:
+            return None
+        position = old_index-len(queue)
+        if old_index < len(queue):
+            entry = from_queued(guild_id, queue.pop(old_index))
+            node.queue = queue
+            await lavalink.set_guild_node(guild_id, node)
+        else:
+            entry = pending.pop(position)
+        if new_index >= len(queue):
+            pending.insert(new_index-len(queue), entry)
+            return entry.title
+        track = await importer.resolve(lavalink, entry)
+        if track is None:
+            pending.insert(min(max(position, 0), len(pending)), entry)
+            return None
+        await _queue(lavalink, guild_id, entry, track)
+        node = await lavalink.get_guild_node(guild_id)
+        queue = node.queue
+        queue.insert(new_index, queue.pop())
+        node.queue = queue
+        await lavalink.set_guild_node(guild_id, node)
+        return entry.title
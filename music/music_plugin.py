@@ -4,34 +4,40 @@ import hikari
 import lightbulb
 import lavasnek_rs
 from ytmusicapi import YTMusic
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 import re
 import lyricsgenius
 import urllib.parse as urlparse
 from lightbulb.ext import neon
-import requests
-import json
 import os
+import downloads
+import spotify
+import track_meta
+import importer
+import lookahead
 
 HIKARI_VOICE = False
 URL_REGEX = r"(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’]))"
 TIME_REGEX = r"([0-9]{1,2})[:ms](([0-9]{1,2})s?)?"
-SPOTCLIENT_ID=os.getenv("SPOTID")
-SPOTCLIENT_SECRET=os.getenv("SPOTSECRET")
 GENIUS_API_KEY=os.getenv("GENAPI")
 TOKEN=os.getenv("TOKEN")
 LAVALINK_SERVER="lavalink"
 LAVALINK_PASSWORD="nikomusic"
+QUEUE_PAGE = 15
 
 class EventHandler:
 
-    async def track_start(self, _: lavasnek_rs.Lavalink, event: lavasnek_rs.TrackStart) -> None:
+    async def track_start(self, lavalink: lavasnek_rs.Lavalink, event: lavasnek_rs.TrackStart) -> None:
         logging.info("Track started on guild: %s", event.guild_id)
+        node = await lavalink.get_guild_node(event.guild_id)
+        track_meta.prune(event.guild_id, node.queue if node else [])
+        lookahead.schedule(lavalink, event.guild_id)
         
 
-    async def track_finish(self, _: lavasnek_rs.Lavalink, event: lavasnek_rs.TrackFinish) -> None:
+    async def track_finish(self, lavalink: lavasnek_rs.Lavalink, event: lavasnek_rs.TrackFinish) -> None:
         logging.info("Track finished on guild: %s", event.guild_id)
+        node = await lavalink.get_guild_node(event.guild_id)
+        track_meta.prune(event.guild_id, node.queue if node else [])
+        lookahead.schedule(lavalink, event.guild_id)
 
     async def track_exception(self, lavalink: lavasnek_rs.Lavalink, event: lavasnek_rs.TrackException) -> None:
         logging.warning("Track exception event happened on guild: %d", event.guild_id)
@@ -116,11 +122,37 @@ async def leave(ctx: lightbulb.Context) -> None:
         return None
     else:
         await plugin.bot.d.lavalink.leave(ctx.guild_id)
+    importer.cancel(ctx.guild_id)
+    lookahead.forget(ctx.guild_id)
     await plugin.bot.d.lavalink.remove_guild_node(ctx.guild_id)
+    track_meta.forget(ctx.guild_id)
     await plugin.bot.d.lavalink.remove_guild_from_loops(ctx.guild_id)
     embed = hikari.Embed(title="**Left voice channel.**", colour=0x6100FF)
     await ctx.respond(embed=embed)
 
+async def _import(ctx: lightbulb.Context, response: lightbulb.ResponseProxy, entries, kind: str) -> None:
+    entries = await entries
+    if not entries:
+        embed=hikari.Embed(title=f"**Unable to load that {kind.lower()} from Spotify.**", color=0xC80000)
+        await response.edit(embed=embed)
+        return
+
+    async def progress(queued: int, failed: int, total: int) -> None:
+        embed=hikari.Embed(title=f"**Importing {kind}...**", description=f"Queued {queued} of {total} tracks.", color=0x6100FF)
+        await response.edit(embed=embed)
+
+    if len(entries) > lookahead.THRESHOLD or lookahead.active(ctx.guild_id):
+        lookahead.extend(ctx.guild_id, entries, ctx.author.id)
+        await lookahead.top_up(plugin.bot.d.lavalink, ctx.guild_id)
+        embed=hikari.Embed(title=f"**Added {kind} To The Queue.**", description=f"Queued {len(entries)} tracks. Upcoming tracks are found as they come up.", color=0x6100FF)
+        await response.edit(embed=embed)
+        return
+    queued, failed = await importer.enqueue(plugin.bot.d.lavalink, ctx.guild_id, ctx.author.id, entries, progress)
+    embed=hikari.Embed(title=f"**Added {kind} To The Queue.**", description=f"Queued {queued} of {len(entries)} tracks.", color=0x6100FF)
+    if failed:
+        embed.set_footer(f"{failed} tracks could not be found.")
+    await response.edit(embed=embed)
+
 @plugin.command()
 @lightbulb.add_checks(lightbulb.guild_only)
 @lightbulb.option("song", "The name of the song you want to play.", modifier=lightbulb.OptionModifier.CONSUME_REST)
@@ -146,38 +178,17 @@ async def play(ctx: lightbulb.Context) -> None:
         embed=hikari.Embed(title="**Supported Platforms : Soundcloud, Spotify, Bandcamp, Vimeo, Twitch and HTTP Streams.**", color=0xC80000)
         return await ctx.respond(embed=embed)
     if "https://open.spotify.com/playlist" in ctx.options.song:
-        sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=SPOTCLIENT_ID,client_secret=SPOTCLIENT_SECRET))
         playlist_link = f"{ctx.options.song}"
         playlist_URI = playlist_link.split("/")[-1].split("?")[0]
-        track_uris = [x["track"]["uri"] for x in sp.playlist_tracks(playlist_URI)["items"]]
-        for track in sp.playlist_tracks(playlist_URI)["items"]:
-         track_name = track["track"]["name"]
-         track_artist = track["track"]["artists"][0]["name"]
-         queryfinal = f"{track_name} " + " " + f"{track_artist}" 
-         result = f"ytmsearch:{queryfinal}"
-         query_information = await plugin.bot.d.lavalink.get_tracks(result)
-         try:
-          await plugin.bot.d.lavalink.play(ctx.guild_id, query_information.tracks[0]).requester(ctx.author.id).queue()
-         except:
-          pass
-        embed=hikari.Embed(title="**Added Playlist To The Queue.**", color=0x6100FF)
-        return await ctx.respond(embed=embed)
-    if "https://open.spotify.com/album" in ctx.options.song:	
-        sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=SPOTCLIENT_ID,client_secret=SPOTCLIENT_SECRET))
+        response = await ctx.respond(embed=hikari.Embed(title="**Importing Playlist...**", color=0x6100FF))
+        importer.start(ctx.guild_id, _import(ctx, response, importer.playlist(playlist_URI), "Playlist"))
+        return
+    if "https://open.spotify.com/album" in ctx.options.song:
         album_link = f"{query}"
         album_id= album_link.split("/")[-1].split("?")[0]
-        for track in sp.album_tracks(album_id)["items"]:
-         track_name = track["name"]
-         track_artist = track["artists"][0]["name"]
-         queryfinal = f"{track_name} " + f"{track_artist}" 
-         result = f"ytmsearch:{queryfinal}"
-         query_information = await plugin.bot.d.lavalink.get_tracks(result)
-         try:
-          await plugin.bot.d.lavalink.play(ctx.guild_id, query_information.tracks[0]).requester(ctx.author.id).queue()
-         except:
-          pass
-        embed=hikari.Embed(title="**Added Album To The Queue.**", color=0x6100FF)
-        return await ctx.respond(embed=embed)
+        response = await ctx.respond(embed=hikari.Embed(title="**Importing Album...**", color=0x6100FF))
+        importer.start(ctx.guild_id, _import(ctx, response, importer.album(album_id), "Album"))
+        return
     if not re.match(URL_REGEX, query):
       result = f"ytmsearch:{query}"
       query_information = await plugin.bot.d.lavalink.get_tracks(result)
@@ -189,11 +200,10 @@ async def play(ctx: lightbulb.Context) -> None:
         return
     node = await plugin.bot.d.lavalink.get_guild_node(ctx.guild_id)
     if not node or not node.now_playing:
-     sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=SPOTCLIENT_ID,client_secret=SPOTCLIENT_SECRET))
-     results = sp.search(q=f'{query}', limit=1)
-     for idx, track in enumerate(results['tracks']['items']):
-        querytrack = track['name']
-        queryartist = track["artists"][0]["name"]	
+     track = await spotify.search_track(f'{query}')
+     if track:
+         querytrack = track['name']
+         queryartist = track["artists"][0]["name"]
      embed1=hikari.Embed(title="**Now Playing**",color=0x6100FF)
      try:
         embed1.add_field(name="Name", value=f"{[querytrack]}({track['external_urls']['spotify']})", inline=False)
@@ -222,12 +232,10 @@ async def play(ctx: lightbulb.Context) -> None:
         pass
      await ctx.respond(embed=embed1)
     else:
-     sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=SPOTCLIENT_ID,client_secret=SPOTCLIENT_SECRET))
-     results = sp.search(q=f'{query}', limit=1)
-     for idx, track in enumerate(results['tracks']['items']):
-        querytrack = track['name']
-        print(querytrack)
-        queryartist = track["artists"][0]["name"]	
+     track = await spotify.search_track(f'{query}')
+     if track:
+         querytrack = track['name']
+         queryartist = track["artists"][0]["name"]
      embed=hikari.Embed(title="**Queued Track**",color=0x6100FF)
      try:
         embed.add_field(name="Name", value=f"{[querytrack]}({track['external_urls']['spotify']})", inline=False)
@@ -255,6 +263,13 @@ async def play(ctx: lightbulb.Context) -> None:
      except:
         pass
      await ctx.respond(embed=embed)
+    if lookahead.active(ctx.guild_id):
+        info = query_information.tracks[0].info
+        entry = importer.Entry(info.title, info.author, info.length, track_meta.from_spotify(track), track=query_information.tracks[0])
+        lookahead.extend(ctx.guild_id, [entry], ctx.author.id)
+        lookahead.schedule(plugin.bot.d.lavalink, ctx.guild_id)
+        return
+    track_meta.remember(ctx.guild_id, query_information.tracks[0], track_meta.from_spotify(track))
     try:
         await plugin.bot.d.lavalink.play(ctx.guild_id, query_information.tracks[0]).requester(ctx.author.id).queue()
     except lavasnek_rs.NoSessionPresent:
@@ -276,17 +291,10 @@ async def stop(ctx: lightbulb.Context) -> None:
         embed = hikari.Embed(title="**There are no songs playing at the moment.**", colour=0xC80000)
         await ctx.respond(embed=embed)
         return
-    sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=SPOTCLIENT_ID,client_secret=SPOTCLIENT_SECRET))
-    results = sp.search(q=f"{node.now_playing.track.info.author} {node.now_playing.track.info.title}", limit=1)
-    print(f"{node.now_playing.track.info.author} {node.now_playing.track.info.title}")  
-    for idx, track in enumerate(results['tracks']['items']):
-        querytrack = track['name']
-        queryartist = track["artists"][0]["name"]	
+    meta = track_meta.get(ctx.guild_id, node.now_playing.track)
     embed = hikari.Embed(title=f"**Stopped {node.now_playing.track.info.title}.**", colour=0x6100FF)
-    try:
-        embed.set_thumbnail(f"{track['album']['images'][0]['url']}")
-    except:
-        pass
+    if meta and meta.art_url:
+        embed.set_thumbnail(meta.art_url)
     try:
         length = divmod(node.now_playing.track.info.length, 60000)
         position = divmod(node.now_playing.track.info.position, 60000)
@@ -342,17 +350,10 @@ async def seek(ctx: lightbulb.Context) -> None:
     else:
             secs = int(match.group(1))
     await plugin.bot.d.lavalink.seek_millis(ctx.guild_id, secs * 1000)
-    sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=SPOTCLIENT_ID,client_secret=SPOTCLIENT_SECRET))
-    results = sp.search(q=f"{node.now_playing.track.info.author} {node.now_playing.track.info.title}", limit=1)
-    print(f"{node.now_playing.track.info.author} {node.now_playing.track.info.title}")  
-    for idx, track in enumerate(results['tracks']['items']):
-        querytrack = track['name']
-        queryartist = track["artists"][0]["name"]	
+    meta = track_meta.get(ctx.guild_id, node.now_playing.track)
     embed = hikari.Embed(title=f"**Seeked {node.now_playing.track.info.title}.**", colour=0x6100FF)
-    try:
-        embed.set_thumbnail(f"{track['album']['images'][0]['url']}")
-    except:
-        pass
+    if meta and meta.art_url:
+        embed.set_thumbnail(meta.art_url)
     try:
         length = divmod(node.now_playing.track.info.length, 60000)
 
@@ -420,17 +421,10 @@ async def pause(ctx: lightbulb.Context) -> None:
         embed = hikari.Embed(title="**There are no songs playing at the moment.**", colour=0xC80000)
         await ctx.respond(embed=embed)
         return
-    sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=SPOTCLIENT_ID,client_secret=SPOTCLIENT_SECRET))
-    results = sp.search(q=f"{node.now_playing.track.info.author} {node.now_playing.track.info.title}", limit=1)
-    print(f"{node.now_playing.track.info.author} {node.now_playing.track.info.title}")  
-    for idx, track in enumerate(results['tracks']['items']):
-        querytrack = track['name']
-        queryartist = track["artists"][0]["name"]	
+    meta = track_meta.get(ctx.guild_id, node.now_playing.track)
     embed = hikari.Embed(title=f"**Paused {node.now_playing.track.info.title}.**", colour=0x6100FF)
-    try:
-        embed.set_thumbnail(f"{track['album']['images'][0]['url']}")
-    except:
-        pass
+    if meta and meta.art_url:
+        embed.set_thumbnail(meta.art_url)
     try:
         length = divmod(node.now_playing.track.info.length, 60000)
         position = divmod(node.now_playing.track.info.position, 60000)
@@ -456,17 +450,10 @@ async def resume(ctx: lightbulb.Context) -> None:
         embed = hikari.Embed(title="**There are no songs playing at the moment.**", colour=0xC80000)
         await ctx.respond(embed=embed)
         return
-    sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=SPOTCLIENT_ID,client_secret=SPOTCLIENT_SECRET))
-    results = sp.search(q=f"{node.now_playing.track.info.author} {node.now_playing.track.info.title}", limit=1)
-    print(f"{node.now_playing.track.info.author} {node.now_playing.track.info.title}")  
-    for idx, track in enumerate(results['tracks']['items']):
-        querytrack = track['name']
-        queryartist = track["artists"][0]["name"]	
+    meta = track_meta.get(ctx.guild_id, node.now_playing.track)
     embed = hikari.Embed(title=f"**Resumed {node.now_playing.track.info.title}.**", colour=0x6100FF)
-    try:
-        embed.set_thumbnail(f"{track['album']['images'][0]['url']}")
-    except:
-        pass
+    if meta and meta.art_url:
+        embed.set_thumbnail(meta.art_url)
     try:
         length = divmod(node.now_playing.track.info.length, 60000)
         position = divmod(node.now_playing.track.info.position, 60000)
@@ -498,12 +485,12 @@ async def lyrics(ctx: lightbulb.Context) -> None:
      if total > 650:
        embed=hikari.Embed(title="**Character Limit Exceeded!**", description=f"The lyrics in this song are too long. (Over 6000 characters)", color=0xC80000)
        await ctx.respond(embed=embed)
-     sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=SPOTCLIENT_ID,client_secret=SPOTCLIENT_SECRET))
-     results = sp.search(q=f'{ctx.options.song}', limit=1)
-     for idx, track in enumerate(results['tracks']['items']):
-        querytrack = track['name']
-        queryartist = track["artists"][0]["name"]
-        queryfinal =f"{queryartist}" + " " + f"{querytrack}"
+     track = await spotify.search_track(f'{ctx.options.song}')
+     querytrack = song.title
+     if track:
+         querytrack = track['name']
+         queryartist = track["artists"][0]["name"]
+         queryfinal =f"{queryartist}" + " " + f"{querytrack}"
      embed2=hikari.Embed(title=f"**{querytrack}**" ,description=f"{song.lyrics}", color=0x6100FF)
      await ctx.respond(embed=embed2)
 
@@ -523,39 +510,28 @@ async def now_playing(ctx: lightbulb.Context) -> None:
         embed = hikari.Embed(title="**There are no songs playing at the moment.**", colour=0xC80000)
         await ctx.respond(embed=embed)
         return
-    sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=SPOTCLIENT_ID,client_secret=SPOTCLIENT_SECRET))
-    results = sp.search(q=f"{node.now_playing.track.info.author} {node.now_playing.track.info.title}", limit=1)
-    print(f"{node.now_playing.track.info.author} {node.now_playing.track.info.title}")  
-    for idx, track in enumerate(results['tracks']['items']):
-        querytrack = track['name']
-        queryartist = track["artists"][0]["name"]	
+    meta = track_meta.get(ctx.guild_id, node.now_playing.track)
     embed=hikari.Embed(title="**Currently Playing**",color=0x6100FF)
-    try:
-        embed.add_field(name="Name", value=f"{[querytrack]}({track['external_urls']['spotify']})", inline=False)
-    except:
+    if meta and meta.url:
+        embed.add_field(name="Name", value=f"{[meta.name]}({meta.url})", inline=False)
+    else:
         embed.add_field(name="Name", value=f"{node.now_playing.track.info.title}", inline=False)
-    try:
-        embed.add_field(name="Artist", value=f"{[queryartist]}({track['artists'][0]['external_urls']['spotify']})", inline=False)
-    except:
+    if meta and meta.artist_url:
+        embed.add_field(name="Artist", value=f"{[meta.artist]}({meta.artist_url})", inline=False)
+    else:
         embed.add_field(name="Artist", value=f"{node.now_playing.track.info.author}", inline=False)
-    try:
-        embed.add_field(name="Album", value=f"{[track['album']['name']]}({track['album']['external_urls']['spotify']})", inline=False)
-    except:
-        pass
+    if meta and meta.album_url:
+        embed.add_field(name="Album", value=f"{[meta.album]}({meta.album_url})", inline=False)
     try:
         length = divmod(node.now_playing.track.info.length, 60000)
         position = divmod(node.now_playing.track.info.position, 60000)
         embed.add_field(name="Duration Played", value=f"{int(position[0])}:{round(position[1]/1000):02}/{int(length[0])}:{round(length[1]/1000):02}")
     except:
         pass
-    try:
-        embed.add_field(name="Release Date", value=f"{track['album']['release_date']}", inline=False)
-    except:
-        pass
-    try:
-        embed.set_thumbnail(f"{track['album']['images'][0]['url']}")
-    except:
-        pass
+    if meta and meta.release_date:
+        embed.add_field(name="Release Date", value=f"{meta.release_date}", inline=False)
+    if meta and meta.art_url:
+        embed.set_thumbnail(meta.art_url)
     await ctx.respond(embed=embed)
 
 @plugin.command()
@@ -574,23 +550,23 @@ async def queue(ctx: lightbulb.Context) -> None:
         embed = hikari.Embed(title="**There are no songs playing at the moment.**", colour=0xC80000)
         await ctx.respond(embed=embed)
         return
-    embed = hikari.Embed(title="**The Queue**",description=f"Here are the next **{len(node.queue)}** tracks.",color=0x6100FF)
-    sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=SPOTCLIENT_ID,client_secret=SPOTCLIENT_SECRET))
-    results = sp.search(q=f'{node.now_playing.track.info.author} {node.now_playing.track.info.title}', limit=1)
-    for idx, track in enumerate(results['tracks']['items']):
-        querytrack = track['name']
-        queryartist = track["artists"][0]["name"]	
-    try:
-        embed.set_thumbnail(f"{track['album']['images'][0]['url']}")
-    except:
-        pass
-    try:
-      embed.add_field(name="Currently playing", value=f"{[node.queue[0].track.info.title]}({track['external_urls']['spotify']})")
-    except:
-      embed.add_field(name="Currently playing", value=f"{node.queue[0].track.info.title}")  
-    i = 1
-    if len(node.queue) > 1:
-        embed.add_field(name="Upcoming", value=f"\n".join([f'**{i}.** {tq.track.info.title}' for i, tq in enumerate(node.queue[1:], start=1)]))
+    pending = lookahead.entries(ctx.guild_id)
+    embed = hikari.Embed(title="**The Queue**",description=f"Here are the next **{len(node.queue)+len(pending)}** tracks.",color=0x6100FF)
+    meta = track_meta.get(ctx.guild_id, node.now_playing.track)
+    if meta and meta.art_url:
+        embed.set_thumbnail(meta.art_url)
+    if meta and meta.url:
+        embed.add_field(name="Currently playing", value=f"{[node.queue[0].track.info.title]}({meta.url})")
+    else:
+        embed.add_field(name="Currently playing", value=f"{node.queue[0].track.info.title}")
+    upcoming = [tq.track.info.title for tq in node.queue[1:QUEUE_PAGE+1]]
+    upcoming += [f"{entry.title} - {entry.artist}" for entry in pending[:QUEUE_PAGE-len(upcoming)]]
+    if upcoming:
+        lines = [f'**{i}.** {title}' for i, title in enumerate(upcoming, start=1)]
+        remaining = len(node.queue)-1+len(pending)-len(upcoming)
+        if remaining > 0:
+            lines.append(f"...and {remaining} more.")
+        embed.add_field(name="Upcoming", value="\n".join(lines))
     await ctx.respond(embed=embed)
     
 @plugin.command()
@@ -616,6 +592,13 @@ async def remove(ctx: lightbulb.Context) -> None:
     if index == 0:
         embed = hikari.Embed(title=f"**You cannot remove a song that is currently playing.**",color=0xC80000)
         return await ctx.respond(embed=embed)
+    if index >= len(node.queue):
+        entry = await lookahead.remove(plugin.bot.d.lavalink, ctx.guild_id, index)
+        if entry is None:
+            embed = hikari.Embed(title=f"**Incorrect position entered.**",color=0xC80000)
+            return await ctx.respond(embed=embed)
+        embed = hikari.Embed(title=f"**Removed {entry.title}.**",color=0x6100FF,)
+        return await ctx.respond(embed=embed)
     try:
      queue = node.queue
      song_to_be_removed = queue[index]
@@ -628,6 +611,8 @@ async def remove(ctx: lightbulb.Context) -> None:
         pass
     node.queue = queue
     await plugin.bot.d.lavalink.set_guild_node(ctx.guild_id, node)
+    track_meta.prune(ctx.guild_id, queue)
+    lookahead.schedule(plugin.bot.d.lavalink, ctx.guild_id)
     embed = hikari.Embed(title=f"**Removed {song_to_be_removed.track.info.title}.**",color=0x6100FF,)
     await ctx.respond(embed=embed)
 
@@ -698,6 +683,14 @@ async def move(ctx: lightbulb.Context) -> None:
     if not len(node.queue) >= 1:
         embed = hikari.Embed(title=f"**There is only 1 song in the queue.**",color=0xC80000)
         await ctx.respond(embed=embed)
+    if old_index >= len(node.queue) or new_index >= len(node.queue):
+        title = await lookahead.move(plugin.bot.d.lavalink, ctx.guild_id, old_index, new_index)
+        if title is None:
+            embed = hikari.Embed(title=f"**Unable to move that track.**",color=0xC80000)
+            return await ctx.respond(embed=embed)
+        lookahead.schedule(plugin.bot.d.lavalink, ctx.guild_id)
+        embed = hikari.Embed(title=f"**Moved {title} to position {new_index}.**", color=0x6100FF)
+        return await ctx.respond(embed=embed)
     queue = node.queue
     song_to_be_moved = queue[old_index]
     try:
@@ -730,7 +723,10 @@ async def empty(ctx: lightbulb.Context) -> None:
     node = await plugin.bot.d.lavalink.get_guild_node(ctx.guild_id)
     await plugin.bot.d.lavalink.stop(ctx.guild_id)
     await plugin.bot.d.lavalink.leave(ctx.guild_id)
+    importer.cancel(ctx.guild_id)
+    lookahead.forget(ctx.guild_id)
     await plugin.bot.d.lavalink.remove_guild_node(ctx.guild_id)
+    track_meta.forget(ctx.guild_id)
     await plugin.bot.d.lavalink.remove_guild_from_loops(ctx.guild_id)
     await plugin.bot.update_voice_state(ctx.guild_id, None)
     await plugin.bot.d.lavalink.wait_for_connection_info_remove(ctx.guild_id)
@@ -898,17 +894,26 @@ async def help(ctx: lightbulb.Context) -> None:
 @lightbulb.implements(lightbulb.PrefixCommand)
 async def download_command(ctx: lightbulb.Context) -> None:
     query = ctx.options.query.strip("<>")
-    if not re.match(URL_REGEX, query):
-     url = requests.get(f"http://jiosaavnapi:5000/result/?query={query}")
-     decode = json.loads(url.text)
-     jiosong = decode[0]['media_url']
-     song= decode[0]['song']
-     os.system(f"youtube-dl -o '/musicfiles/%(title)s-%(id)s.%(ext)s' {jiosong} -x --audio-format mp3")
-     name = os.listdir("/musicfiles/")[0]
-     os.rename(f"/musicfiles/{name}", f"/musicfiles/{song}.mp3")
-     namefinal = os.listdir("/musicfiles/")[0] 
-     await ctx.respond(attachment=hikari.File(f"/musicfiles/{namefinal}"))
-     os.remove(f"/musicfiles/{namefinal}")
+    if re.match(URL_REGEX, query):
+        embed = hikari.Embed(title="**Downloads only work with song names.**", colour=0xC80000)
+        await ctx.respond(embed=embed)
+        return
+    response = await ctx.respond(embed=hikari.Embed(title="**Download**", description="Starting...", colour=0x6100FF))
+
+    async def progress(message: str) -> None:
+        await response.edit(embed=hikari.Embed(title="**Download**", description=message, colour=0x6100FF))
+
+    try:
+        async with downloads.job(ctx.guild_id, query, progress) as (song, path):
+            await progress(f"Uploading **{song['song']}**...")
+            await ctx.respond(attachment=hikari.File(path, filename=downloads.filename(song)))
+            await progress(f"Downloaded **{song['song']}**.")
+    except downloads.DownloadError as e:
+        await response.edit(embed=hikari.Embed(title=f"**{e}**", colour=0xC80000))
+    except hikari.HTTPError as e:
+        logging.warning("Download upload failed for %r: %s", query, e)
+        title = "**The song is too large to upload here.**" if getattr(e, "status", None) == 413 else "**The song could not be uploaded.**"
+        await response.edit(embed=hikari.Embed(title=title, colour=0xC80000))
 
 if HIKARI_VOICE:
 
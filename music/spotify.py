@@ -0,0 +1,43 @@
+import os
+import asyncio
+import logging
+import functools
+import requests
+import spotipy
+from concurrent.futures import ThreadPoolExecutor
+from spotipy.cache_handler import MemoryCacheHandler
+from spotipy.oauth2 import SpotifyClientCredentials, SpotifyOauthError
+
+CLIENT_ID = os.getenv("SPOTID")
+CLIENT_SECRET = os.getenv("SPOTSECRET")
+TIMEOUT = float(os.environ.get("SPOTIFY_TIMEOUT", 3))
+RETRIES = int(os.environ.get("SPOTIFY_RETRIES", 1))
+WORKERS = int(os.environ.get("SPOTIFY_WORKERS", 8))
+
+_client = None
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="spotify")
+
+def client():
+    global _client
+    if _client is None:
+        auth = SpotifyClientCredentials(client_id=CLIENT_ID, client_secret=CLIENT_SECRET, cache_handler=MemoryCacheHandler(), requests_timeout=TIMEOUT)
+        _client = spotipy.Spotify(auth_manager=auth, requests_session=True, requests_timeout=TIMEOUT, retries=RETRIES)
+    return _client
+
+async def call(method, *args, timeout=TIMEOUT, **kwargs):
+    loop = asyncio.get_running_loop()
+    fn = functools.partial(getattr(client(), method), *args, **kwargs)
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(_executor, fn), timeout)
+    except asyncio.TimeoutError:
+        logging.warning("Spotify %s timed out after %ss", method, timeout)
+    except (spotipy.SpotifyException, SpotifyOauthError, requests.RequestException) as e:
+        logging.warning("Spotify %s failed: %s", method, e)
+    return None
+
+async def search_track(query):
+    results = await call("search", q=query, limit=1)
+    try:
+        return results['tracks']['items'][0]
+    except (TypeError, KeyError, IndexError):
+        return None
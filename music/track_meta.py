@@ -0,0 +1,50 @@
+_guilds = {}
+
+class TrackMeta:
+    __slots__ = ('name', 'url', 'artist', 'artist_url', 'album', 'album_url', 'art_url', 'release_date')
+
+    def __init__(self, name, url=None, artist=None, artist_url=None, album=None, album_url=None, art_url=None, release_date=None):
+        self.name = name
+        self.url = url
+        self.artist = artist
+        self.artist_url = artist_url
+        self.album = album
+        self.album_url = album_url
+        self.art_url = art_url
+        self.release_date = release_date
+
+def from_spotify(track, album=None):
+    if not track or not track.get('name'):
+        return None
+    artists = track.get('artists') or [{}]
+    album = track.get('album') or album or {}
+    images = album.get('images') or [{}]
+    return TrackMeta(
+        track['name'],
+        url=(track.get('external_urls') or {}).get('spotify'),
+        artist=artists[0].get('name'),
+        artist_url=(artists[0].get('external_urls') or {}).get('spotify'),
+        album=album.get('name'),
+        album_url=(album.get('external_urls') or {}).get('spotify'),
+        art_url=images[0].get('url'),
+        release_date=album.get('release_date'))
+
+def remember(guild_id, track, meta):
+    if meta is not None:
+        _guilds.setdefault(guild_id, {})[track.info.identifier] = meta
+
+def get(guild_id, track):
+    return _guilds.get(guild_id, {}).get(track.info.identifier)
+
+def prune(guild_id, queue):
+    tracks = _guilds.get(guild_id)
+    if not tracks:
+        return
+    queued = {entry.track.info.identifier for entry in queue}
+    for identifier in [identifier for identifier in tracks if identifier not in queued]:
+        del tracks[identifier]
+    if not tracks:
+        del _guilds[guild_id]
+
+def forget(guild_id):
+    _guilds.pop(guild_id, None)